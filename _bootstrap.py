@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Agent Module Bootstrap
+Imports the Agents SDK and the optional JSON accelerator once, with the JSON and tool-argument helpers every agent module uses.
+"""
+
+import json
+from typing import Any
+
+# --- Optional fast JSON encoder/decoder (safe if orjson isn't installed) ---
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+# Import the Agents SDK
+try:
+    from agents import Agent, FileSearchTool, FunctionTool, Runner, WebSearchTool  # type: ignore
+except Exception as e:
+    raise RuntimeError(
+        "Could not import your 'agents' SDK. Ensure the 'agents' package "
+        "is installed and provides Agent, FileSearchTool, FunctionTool, Runner, WebSearchTool."
+    ) from e
+
+__all__ = [
+    "Agent", "FileSearchTool", "FunctionTool", "Runner", "WebSearchTool",
+    "json_bytes", "json_compact", "json_loads", "json_pretty", "parse_args",
+]
+
+def json_bytes(obj: Any) -> bytes:
+    """Encode obj as UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+def json_compact(obj: Any) -> str:
+    """Encode obj as compact JSON text."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def json_loads(data) -> Any:
+    """Decode JSON from bytes or text."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def json_pretty(obj: Any) -> str:
+    """Render obj as indented JSON for people to read."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+def parse_args(model_cls, args):
+    """Validate tool arguments, parsing JSON text directly in pydantic-core."""
+    if isinstance(args, str):
+        return model_cls.model_validate_json(args)
+    return model_cls.model_validate(args)
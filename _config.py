@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Shared Configuration
+Defaults used by more than one agent or orchestrator module.
+"""
+
+from typing import Tuple
+
+# Knowledge repository searched by FileSearch when no vector store is given
+DEFAULT_VECTOR_STORE_IDS: Tuple[str, ...] = ("vs_689ca12932cc8191a0223ebc3a1d6116",)
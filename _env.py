@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Environment Bootstrap
+Loads the optional .env file once per process, however many agent modules import it.
+"""
+
+import os
+from typing import Iterable
+
+# Variables each kind of module needs; when all are already set, .env is skipped
+OPENAI_VARS = ("OPENAI_API_KEY",)
+SERVICENOW_VARS = ("SN_INSTANCE", "SN_USER", "SN_PASS")
+
+_loaded = False
+
+def ensure_env(required: Iterable[str] = ()):
+    """Load .env into the environment (safe if python-dotenv isn't installed).
+
+    If every variable in ``required`` is already set, the file isn't read at all.
+    """
+    global _loaded
+    if _loaded:
+        return
+    required = tuple(required)
+    if required and all(os.getenv(name) for name in required):
+        return
+    _loaded = True
+    try:
+        from dotenv import load_dotenv  # type: ignore
+        load_dotenv(".env", override=False)
+    except Exception:
+        pass
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Client
+One pooled httpx.AsyncClient per event loop, shared by every module that calls out over HTTP.
+"""
+
+import asyncio
+import weakref
+import importlib.util
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+# HTTP/2 multiplexing when h2 is installed; plain HTTP/1.1 keep-alive otherwise
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Pooled connections can't cross event loops, and the Streamlit UI runs one loop per session,
+# so each loop gets its own client; it's dropped with its loop
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> "httpx.AsyncClient":
+    """Return this event loop's shared client, creating it on first use."""
+    import httpx  # deferred: importing an agent as a library shouldn't pay for the HTTP stack
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = _CLIENTS[loop] = httpx.AsyncClient(
+            http2=_HTTP2,
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=60),
+            headers={"Accept": "application/json", "Content-Type": "application/json"},
+        )
+    return client
+
+
+async def close_client() -> None:
+    """Close this event loop's shared client, if one was opened."""
+    client = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
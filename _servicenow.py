@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+ServiceNow Helpers
+Retry policy, idempotency tags and the recent-incident cache shared by every module that creates ServiceNow incidents.
+"""
+
+import json
+import time
+import random
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Retry policy: transient statuses and transport errors only, with full-jitter backoff
+MAX_ATTEMPTS = 3
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+def retry_delay(attempts: int, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before the next attempt: full-jitter backoff, at least the server's Retry-After."""
+    delay = random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempts))
+    if retry_after:
+        try:
+            delay = max(delay, min(MAX_BACKOFF, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date form; keep the backoff
+    return delay
+
+
+def idempotency_tag(payload: Dict[str, Any], scope: Optional[str] = None) -> str:
+    """Tag an incident by its whole (redacted) payload, optionally within a scope such as a chat session.
+
+    Two requests share a tag only if every field matches, so a different problem that happens to get
+    the same short description is never mistaken for a repeat.
+    """
+    # Not a security control: the tag only spots accidental repeats and is written into the ticket, so anyone
+    # reading it can reproduce it. 6 bytes (12 hex chars) keeps it short there; a chance collision among the
+    # _IDEM_CACHE_SIZE cached incidents is about 1 in 500 million, and a wider digest_size would buy fewer at the cost of length.
+    base = json.dumps([scope, payload], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(base.encode("utf-8"), digest_size=6).hexdigest()
+
+
+# Recently created incidents by idempotency tag, so an accidental repeat doesn't POST again
+_IDEM_CACHE_TTL = 300.0
+_IDEM_CACHE_SIZE = 1024
+_idem_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+def idem_cache_get(idem: str) -> Optional[Dict[str, Any]]:
+    """Return the incident created for this tag (same payload, same scope) within the TTL, if any."""
+    entry = _idem_cache.get(idem)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= _IDEM_CACHE_TTL:
+        del _idem_cache[idem]
+        return None
+    return entry[1]
+
+
+def idem_cache_put(idem: str, result: Dict[str, Any]) -> None:
+    """Remember a created incident, evicting the oldest entry when full."""
+    _idem_cache[idem] = (time.monotonic(), result)
+    _idem_cache.move_to_end(idem)
+    if len(_idem_cache) > _IDEM_CACHE_SIZE:
+        _idem_cache.popitem(last=False)
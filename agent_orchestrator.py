@@ -5,22 +5,21 @@ Coordinates between specialized agents: WebSearch, FileSearch, and TicketCreatio
 """
 
 import os
+import re
 import sys
 import json
 import asyncio
-from typing import Optional, List
+from typing import Optional, Sequence
 
-# --- Optional .env loader (safe if python-dotenv isn't installed) ---
-try:
-    if os.path.exists(".env"):
-        from dotenv import load_dotenv  # type: ignore
-        load_dotenv()
-except Exception:
-    pass
+# --- Optional .env loader (shared, runs once per process, skipped if already configured) ---
+from _env import OPENAI_VARS, SERVICENOW_VARS, ensure_env
+ensure_env(OPENAI_VARS + SERVICENOW_VARS)
+
+from _config import DEFAULT_VECTOR_STORE_IDS
 
 # Import the individual agents
 from web_search_agent import run_web_search
-from file_search_agent import run_file_search
+from file_search_agent import build_file_search_agent, run_file_search
 from ticket_agent import run_ticket_creation
 
 # -----------------------------
@@ -61,40 +60,42 @@ RESPONSE FORMAT:
 #        Orchestrator Logic
 # -----------------------------
 
+# Routing keywords, matched case-insensitively against the user's question
+TICKET_KEYWORDS = (
+    "create a ticket", "create ticket", "make a ticket", "open a ticket",
+    "laptop not working", "computer not working", "system not working",
+    "need help", "need support", "steps didn't work",
+    "report issue", "report problem", "submit ticket",
+)
+
+FILE_SEARCH_PATTERNS = (
+    "how to", "procedure", "policy", "internal", "company",
+    "system", "process", "documentation", "guide",
+)
+
+# Compiled once so routing is a single C-level scan per pattern set. Patterns match anywhere,
+# as plain substrings, so inflected forms ("guidelines", "processed", "processing") still route
+TICKET_RE = re.compile("|".join(map(re.escape, TICKET_KEYWORDS)), re.IGNORECASE)
+FILE_SEARCH_RE = re.compile("|".join(map(re.escape, FILE_SEARCH_PATTERNS)), re.IGNORECASE)
+
+
 def analyze_request(user_question: str) -> str:
     """Analyze the user request to determine which agent to route to."""
-    question_lower = user_question.lower()
-    
-    # Ticket creation keywords
-    ticket_keywords = [
-        "create a ticket", "create ticket", "make a ticket", "open a ticket",
-        "laptop not working", "computer not working", "system not working",
-        "need help", "need support", "steps didn't work",
-        "report issue", "report problem", "submit ticket"
-    ]
-    
     # Check for ticket creation requests first
-    for keyword in ticket_keywords:
-        if keyword in question_lower:
-            return "TICKET"
+    if TICKET_RE.search(user_question):
+        return "TICKET"
     
     # Check for file search patterns (technical/internal questions)
-    file_search_patterns = [
-        "how to", "procedure", "policy", "internal", "company",
-        "system", "process", "documentation", "guide"
-    ]
-    
-    for pattern in file_search_patterns:
-        if pattern in question_lower:
-            return "FILE_SEARCH"
+    if FILE_SEARCH_RE.search(user_question):
+        return "FILE_SEARCH"
     
     # Default to web search for general questions
     return "WEB_SEARCH"
 
-async def orchestrate_request(user_question: str, vector_store_ids: List[str] = None) -> str:
+async def orchestrate_request(user_question: str, vector_store_ids: Optional[Sequence[str]] = None) -> str:
     """Orchestrate the request to the appropriate agent."""
     if vector_store_ids is None:
-        vector_store_ids = ["vs_689ca12932cc8191a0223ebc3a1d6116"]
+        vector_store_ids = DEFAULT_VECTOR_STORE_IDS
     
     agent_type = analyze_request(user_question)
     
@@ -119,33 +120,51 @@ async def orchestrate_request(user_question: str, vector_store_ids: List[str] =
     except Exception as e:
         return f"❌ Error routing to {agent_type} agent: {str(e)}"
 
-async def orchestrator_repl(vector_store_ids: List[str] = None):
+async def orchestrator_repl(vector_store_ids: Optional[Sequence[str]] = None):
     """Interactive REPL for the orchestrator."""
     if vector_store_ids is None:
-        vector_store_ids = ["vs_689ca12932cc8191a0223ebc3a1d6116"]
+        vector_store_ids = DEFAULT_VECTOR_STORE_IDS
     
     print("🤖 Agent Orchestrator (UK) — type 'exit' to quit.")
     print("Available agents: WebSearch, FileSearch, TicketCreation")
     
-    while True:
-        try:
-            question = input("\nYou: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            print("\nBye!")
-            return
-        if not question:
-            continue
-        if question.lower() in {"exit", "quit"}:
-            print("Bye!")
-            return
-
-        result = await orchestrate_request(question, vector_store_ids)
-        print(f"\n{result}")
+    # Build the file search agent in the background while the user types their first question
+    warmup = asyncio.gather(asyncio.to_thread(build_file_search_agent, vector_store_ids), return_exceptions=True)
+    
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                # Read on a worker thread so the event loop keeps running while the user types
+                question = (await loop.run_in_executor(None, input, "\nYou: ")).strip()
+            except (EOFError, KeyboardInterrupt):
+                print("\nBye!")
+                return
+            if not question:
+                continue
+            if question.lower() in {"exit", "quit"}:
+                print("Bye!")
+                return
+
+            # The agents are built before first use (a failed build is simply retried by the call)
+            await warmup
+            result = await orchestrate_request(question, vector_store_ids)
+            print(f"\n{result}")
+    finally:
+        # Don't leave the build pending (or its outcome unretrieved) when the REPL ends
+        warmup.cancel()
 
 # -----------------------------
 #              CLI
 # -----------------------------
 if __name__ == "__main__":
+    # --- Optional faster event loop (safe if uvloop isn't installed) ---
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
     import argparse
 
     parser = argparse.ArgumentParser(description="Agent Orchestrator - coordinates between specialized agents.")
@@ -153,7 +172,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "--vector-store-id",
         action="append",
-        default=["vs_689ca12932cc8191a0223ebc3a1d6116"],
+        default=list(DEFAULT_VECTOR_STORE_IDS),
         help="Vector store ID(s) for FileSearch (can repeat).",
     )
     args = parser.parse_args()
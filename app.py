@@ -1,20 +1,17 @@
 from agents import Agent, FileSearchTool, Runner, WebSearchTool
 import os
+from _env import OPENAI_VARS, ensure_env
+from _config import DEFAULT_VECTOR_STORE_IDS
+
+ensure_env(OPENAI_VARS)
 
-try:
-    # Lazy import so script still works if python-dotenv not installed
-    if os.path.exists('.env'):
-        from dotenv import load_dotenv  # type: ignore
-        load_dotenv()
-except Exception:
-    pass
 agent = Agent(
     name="Assistant",
     tools=[
         WebSearchTool(),
         FileSearchTool(
             max_num_results=3,
-            vector_store_ids=["vs_689ca12932cc8191a0223ebc3a1d6116"]
+            vector_store_ids=list(DEFAULT_VECTOR_STORE_IDS)
         ),
     ],
 )
@@ -40,5 +37,12 @@ async def main():
     print(result.final_output)
 
 if __name__ == "__main__":
+    # --- Optional faster event loop (safe if uvloop isn't installed) ---
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
     import asyncio
     asyncio.run(main())
\ No newline at end of file
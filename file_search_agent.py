@@ -5,27 +5,16 @@ Specialized agent that only searches the knowledge repository using the agents S
 """
 
 import os
-import sys
-import json
 import asyncio
-from typing import Optional, List
-
-# --- Optional .env loader (safe if python-dotenv isn't installed) ---
-try:
-    if os.path.exists(".env"):
-        from dotenv import load_dotenv  # type: ignore
-        load_dotenv()
-except Exception:
-    pass
-
-# Import the Agents SDK
-try:
-    from agents import Agent, FileSearchTool, Runner  # type: ignore
-except Exception as e:
-    raise RuntimeError(
-        "Could not import your 'agents' SDK. Ensure the 'agents' package "
-        "is installed and provides Agent, FileSearchTool, Runner."
-    ) from e
+import functools
+from typing import Optional, Sequence, Tuple
+
+# --- Optional .env loader (shared, runs once per process, skipped if already configured) ---
+from _env import OPENAI_VARS, ensure_env
+ensure_env(OPENAI_VARS)
+
+from _config import DEFAULT_VECTOR_STORE_IDS
+from _bootstrap import Agent, FileSearchTool, Runner, json_compact, json_pretty
 
 # -----------------------------
 #            POLICY
@@ -48,9 +37,10 @@ When using tools, pass strictly valid JSON that matches the tool schema.
 #        Agent + Runner
 # -----------------------------
 
-def build_file_search_agent(vector_store_ids: List[str]):
-    """Build the file search agent with only file search capabilities."""
-    fs_tool = FileSearchTool(max_num_results=3, vector_store_ids=vector_store_ids)
+@functools.lru_cache(maxsize=8)
+def _build_file_search_agent(vector_store_ids: Tuple[str, ...]):
+    """Build (once per vector store set) the file search agent."""
+    fs_tool = FileSearchTool(max_num_results=3, vector_store_ids=list(vector_store_ids))
     
     agent = Agent(
         name="FileSearchAgent",
@@ -58,7 +48,15 @@ def build_file_search_agent(vector_store_ids: List[str]):
     )
     return agent
 
-async def run_file_search(question: str, vector_store_ids: List[str]) -> str:
+def build_file_search_agent(vector_store_ids: Sequence[str]):
+    """Build the file search agent with only file search capabilities."""
+    return _build_file_search_agent(tuple(vector_store_ids))
+
+def _output_to_text(out) -> str:
+    """Render an agent output as text, compactly for programmatic callers."""
+    return out if isinstance(out, str) else json_compact(out)
+
+async def run_file_search(question: str, vector_store_ids: Sequence[str]) -> str:
     """Run a file search for the given question."""
     agent = build_file_search_agent(vector_store_ids)
     full_prompt = f"{FILE_SEARCH_INSTRUCTIONS}\n\nQuestion: {question}"
@@ -66,9 +64,9 @@ async def run_file_search(question: str, vector_store_ids: List[str]) -> str:
 
     # Be flexible about result shape
     out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
-    return out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2)
+    return _output_to_text(out)
 
-async def run_file_search_streaming(question: str, vector_store_ids: List[str], stream_callback=None):
+async def run_file_search_streaming(question: str, vector_store_ids: Sequence[str], stream_callback=None):
     """Run a file search with streaming support."""
     agent = build_file_search_agent(vector_store_ids)
     full_prompt = f"{FILE_SEARCH_INSTRUCTIONS}\n\nQuestion: {question}"
@@ -78,22 +76,27 @@ async def run_file_search_streaming(question: str, vector_store_ids: List[str],
         stream_callback("📁 Searching knowledge repository...")
     
     try:
-        result = await Runner.run(agent, full_prompt)
-        
-        if stream_callback:
-            stream_callback("📝 Processing results...")
+        # Forward the model's text as it is generated
+        streamed = Runner.run_streamed(agent, full_prompt)
+        sent = False
+        try:
+            async for event in streamed.stream_events():
+                if event.type == "raw_response_event" and getattr(event.data, "type", None) == "response.output_text.delta":
+                    if stream_callback:
+                        stream_callback(event.data.delta)
+                    sent = True
+        except asyncio.CancelledError:
+            # The run has its own background task; stop it along with us
+            streamed.cancel()
+            raise
         
         # Be flexible about result shape
-        out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
-        final_result = out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2)
+        out = streamed.final_output
+        final_result = _output_to_text(out)
         
-        if stream_callback:
-            # Stream the final result in chunks
-            chunk_size = 50
-            for i in range(0, len(final_result), chunk_size):
-                chunk = final_result[i:i + chunk_size]
-                stream_callback(chunk)
-                await asyncio.sleep(0.05)  # Small delay for streaming effect
+        if stream_callback and not sent:
+            # Nothing came through as text deltas; send the result in one piece
+            stream_callback(final_result)
         
         return final_result
         
@@ -103,14 +106,16 @@ async def run_file_search_streaming(question: str, vector_store_ids: List[str],
             stream_callback(error_msg)
         return error_msg
 
-async def file_search_repl(vector_store_ids: List[str]):
+async def file_search_repl(vector_store_ids: Sequence[str]):
     """Interactive REPL for file search agent."""
     print("File Search Agent (UK) — type 'exit' to quit.")
     agent = build_file_search_agent(vector_store_ids)
     
+    loop = asyncio.get_running_loop()
     while True:
         try:
-            question = input("\nYou: ").strip()
+            # Read on a worker thread so the event loop keeps running while the user types
+            question = (await loop.run_in_executor(None, input, "\nYou: ")).strip()
         except (EOFError, KeyboardInterrupt):
             print("\nBye!")
             return
@@ -124,7 +129,7 @@ async def file_search_repl(vector_store_ids: List[str]):
         result = await Runner.run(agent, full_prompt)
         out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
         try:
-            print("\nFileSearchAgent:", out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2))
+            print("\nFileSearchAgent:", out if isinstance(out, str) else json_pretty(out))
         except Exception:
             print("\nFileSearchAgent:", str(out))
 
@@ -132,6 +137,14 @@ async def file_search_repl(vector_store_ids: List[str]):
 #              CLI
 # -----------------------------
 if __name__ == "__main__":
+    # --- Optional faster event loop (safe if uvloop isn't installed) ---
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
+    import sys
     import argparse
 
     parser = argparse.ArgumentParser(description="File Search Agent - specialized for repository searches.")
@@ -139,7 +152,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "--vector-store-id",
         action="append",
-        default=["vs_689ca12932cc8191a0223ebc3a1d6116"],
+        default=list(DEFAULT_VECTOR_STORE_IDS),
         help="Vector store ID(s) for FileSearch (can repeat).",
     )
     args = parser.parse_args()
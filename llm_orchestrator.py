@@ -5,18 +5,19 @@ Uses LLM intelligence to determine which specialized agent to route to.
 """
 
 import os
+import re
 import sys
 import json
 import asyncio
-from typing import Optional, List
+import functools
+from collections import OrderedDict
+from typing import Optional, List, Sequence
 
-# --- Optional .env loader (safe if python-dotenv isn't installed) ---
-try:
-    if os.path.exists(".env"):
-        from dotenv import load_dotenv  # type: ignore
-        load_dotenv()
-except Exception:
-    pass
+# --- Optional .env loader (shared, runs once per process, skipped if already configured) ---
+from _env import OPENAI_VARS, SERVICENOW_VARS, ensure_env
+ensure_env(OPENAI_VARS + SERVICENOW_VARS)
+
+from _config import DEFAULT_VECTOR_STORE_IDS
 
 # Import the Agents SDK
 try:
@@ -29,7 +30,7 @@ except Exception as e:
 
 # Import the individual agents
 from web_search_agent import run_web_search, run_web_search_streaming
-from file_search_agent import run_file_search, run_file_search_streaming
+from file_search_agent import build_file_search_agent, run_file_search, run_file_search_streaming
 from ticket_agent import run_ticket_creation, run_ticket_creation_streaming
 
 # -----------------------------
@@ -64,20 +65,118 @@ RESPOND with ONLY one of these exact strings:
 Do not provide any explanation or additional text - just the agent name.
 """
 
+SUMMARY_INSTRUCTIONS = """
+You keep the running memory of an IT help-desk chat.
+
+Summarize the conversation you are given (and any earlier summary) in at most
+5 short sentences. Keep what later turns may rely on: the user's problem, the
+devices and systems involved, answers already given, ticket numbers, and any
+ticket details still being collected. Reply with the summary only.
+"""
+
 # -----------------------------
 #        LLM Orchestrator
 # -----------------------------
 
+@functools.lru_cache(maxsize=1)
 def build_llm_orchestrator():
-    """Build the LLM orchestrator agent."""
+    """Build the LLM orchestrator agent (built once and reused)."""
     agent = Agent(
         name="LLMOrchestrator",
         tools=[],  # No tools needed - just LLM reasoning
     )
     return agent
 
+@functools.lru_cache(maxsize=1)
+def build_summary_agent():
+    """Build the conversation summarizer agent (built once and reused)."""
+    return Agent(
+        name="ConversationSummarizer",
+        instructions=SUMMARY_INSTRUCTIONS,
+        model="gpt-4o-mini",
+    )
+
+async def summarize_conversation(messages: List[dict], previous_summary: Optional[str] = None) -> str:
+    """Fold chat messages (and any earlier summary) into one short summary."""
+    lines = [f"Earlier summary: {previous_summary}"] if previous_summary else []
+    lines.extend(f"{m['role']}: {m['content']}" for m in messages)
+    
+    result = await Runner.run(build_summary_agent(), "\n".join(lines))
+    out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
+    return (out if isinstance(out, str) else json.dumps(out, ensure_ascii=False)).strip()
+
+def _with_context(user_question: str, context: Optional[str]) -> str:
+    """Prefix the question with the conversation summary, if there is one."""
+    if not context:
+        return user_question
+    return f"Conversation so far: {context}\n\nCurrent request: {user_question}"
+
+# Explicit ticket requests are unambiguous, so they never need an LLM call
+EXPLICIT_TICKET_PHRASES = ("create a ticket", "create ticket", "make a ticket", "open a ticket")
+_EXPLICIT_TICKET_RE = re.compile("|".join(map(re.escape, EXPLICIT_TICKET_PHRASES)), re.IGNORECASE)
+
+# Anything that could be asking for support goes to the LLM; only questions with none of these
+# hints take the FILE_SEARCH fast path. Covers the help-desk phrasings as well as "ticket"/"incident"
+_TICKET_HINT_RE = re.compile(
+    r"\b(?:ticket|incident|support|help\s?desk|service\s?desk|escalat"
+    r"|need (?:some )?help|(?:report|log|raise|submit|file)\w* (?:an? |the |this |my )?(?:issue|problem|fault|call|request|case)"
+    r"|(?:not|isn't|isnt|aren't|stopped|won't|wont|doesn't|doesnt|can't|cant|didn't|didnt) (?:work|boot|start|turn on|connect|log ?in|print)"
+    r"|broken|faulty|crash)",
+    re.IGNORECASE,
+)
+
+# File Search reports misses as "Not found in repository."; any "not found" triggers the web fallback
+_NOT_FOUND_RE = re.compile(r"not found", re.IGNORECASE)
+
+# Only the full sentinel is certain enough to stop File Search mid-stream; a genuine answer
+# can say "not found" (e.g. "if the device is not found in Device Manager")
+_MISS_SENTINEL = "not found in repository"
+_MISS_SENTINEL_RE = re.compile(re.escape(_MISS_SENTINEL), re.IGNORECASE)
+
+# LRU cache of routing decisions, keyed by the normalised question
+_ROUTE_CACHE_SIZE = 1024
+_route_cache: "OrderedDict[str, str]" = OrderedDict()
+
+def _route_cache_key(user_question: str) -> str:
+    """Normalise a question so trivially different phrasings share a cache entry."""
+    return " ".join(user_question.lower().split())
+
+def _route_cache_get(key: str) -> Optional[str]:
+    """Return a cached routing decision, marking it as recently used."""
+    agent_type = _route_cache.get(key)
+    if agent_type is not None:
+        _route_cache.move_to_end(key)
+    return agent_type
+
+def _route_cache_put(key: str, agent_type: str) -> None:
+    """Store a routing decision, evicting the least recently used entry."""
+    _route_cache[key] = agent_type
+    _route_cache.move_to_end(key)
+    if len(_route_cache) > _ROUTE_CACHE_SIZE:
+        _route_cache.popitem(last=False)
+
 async def llm_route_request(user_question: str) -> str:
     """Use LLM to intelligently route the request to appropriate agent."""
+    # Fast path: explicit ticket phrases decide the route on their own
+    if _EXPLICIT_TICKET_RE.search(user_question):
+        return "TICKET"
+    
+    # Fast path: nothing ticket-like, so the default route applies
+    if not _TICKET_HINT_RE.search(user_question):
+        return "FILE_SEARCH"
+    
+    # Repeat questions reuse the earlier decision
+    key = _route_cache_key(user_question)
+    cached = _route_cache_get(key)
+    if cached is not None:
+        return cached
+    
+    agent_type = await _llm_route(user_question)
+    _route_cache_put(key, agent_type)
+    return agent_type
+
+async def _llm_route(user_question: str) -> str:
+    """Ask the LLM orchestrator which agent should handle the request."""
     agent = build_llm_orchestrator()
     full_prompt = f"{LLM_ORCHESTRATOR_INSTRUCTIONS}\n\nUser Request: {user_question}\n\nWhich agent should handle this request?"
     
@@ -101,13 +200,57 @@ async def llm_route_request(user_question: str) -> str:
         # Default to file search for all other questions (will fallback to web search if needed)
         return "FILE_SEARCH"
 
-async def llm_orchestrate_request(user_question: str, vector_store_ids: List[str] = None, ui_mode: bool = False) -> str:
+class _DeferredCallback:
+    """Stream callback that buffers updates until released, then forwards them live."""
+
+    def __init__(self, target):
+        self._target = target
+        self._buffer: List[str] = []
+        self._released = False
+
+    def __call__(self, chunk: str):
+        if self._released:
+            self._target(chunk)
+        else:
+            self._buffer.append(chunk)
+
+    def release(self):
+        """Flush buffered updates to the target and forward any further ones directly."""
+        self._released = True
+        for chunk in self._buffer:
+            self._target(chunk)
+        self._buffer.clear()
+
+class _MissDetector:
+    """Stream callback that forwards updates and flags File Search's "Not found in repository" as soon as it streams past."""
+
+    # Enough trailing context to catch the sentinel split across chunks
+    _OVERLAP = len(_MISS_SENTINEL) - 1
+
+    def __init__(self, target, event: asyncio.Event):
+        self._target = target
+        self._event = event
+        self._tail = ""
+
+    def __call__(self, chunk: str):
+        if self._target:
+            self._target(chunk)
+        if self._event.is_set():
+            return
+        window = self._tail + chunk
+        if _MISS_SENTINEL_RE.search(window):
+            self._event.set()
+        self._tail = window[-self._OVERLAP:]
+
+async def llm_orchestrate_request(user_question: str, vector_store_ids: Optional[Sequence[str]] = None, ui_mode: bool = False, context: Optional[str] = None) -> str:
     """Orchestrate the request using LLM intelligence with File Search → Web Search fallback."""
     if vector_store_ids is None:
-        vector_store_ids = ["vs_689ca12932cc8191a0223ebc3a1d6116"]
+        vector_store_ids = DEFAULT_VECTOR_STORE_IDS
+    # Agents see the conversation summary; routing looks at the request alone
+    agent_input = _with_context(user_question, context)
     
     if not ui_mode:
-        print(f"🤖 LLM Orchestrator: Analyzing request...")
+        print("🤖 LLM Orchestrator: Analyzing request...")
     
     # Use LLM to determine which agent to use
     agent_type = await llm_route_request(user_question)
@@ -115,39 +258,49 @@ async def llm_orchestrate_request(user_question: str, vector_store_ids: List[str
     try:
         if agent_type == "TICKET":
             if not ui_mode:
-                print(f"🤖 LLM Orchestrator: Routing to TICKET agent...")
-            result = await run_ticket_creation(user_question)
+                print("🤖 LLM Orchestrator: Routing to TICKET agent...")
+            result = await run_ticket_creation(agent_input)
             return f"🎫 Ticket Agent Response:\n{result}"
         
         elif agent_type == "FILE_SEARCH":
             if not ui_mode:
-                print(f"🤖 LLM Orchestrator: Starting with FILE_SEARCH agent...")
+                print("🤖 LLM Orchestrator: Starting with FILE_SEARCH agent...")
+            
+            # Start Web Search speculatively so the fallback is already in flight
+            web_task = asyncio.create_task(run_web_search(agent_input))
             
             # Try File Search first
-            file_result = await run_file_search(user_question, vector_store_ids)
+            try:
+                file_result = await run_file_search(agent_input, vector_store_ids)
+            except BaseException:
+                web_task.cancel()
+                raise
             
             # Check if File Search found something useful
-            if "Not found in repository" in file_result or "not found" in file_result.lower():
+            if _NOT_FOUND_RE.search(file_result):
                 if not ui_mode:
-                    print(f"🤖 LLM Orchestrator: File Search returned no results, falling back to WEB_SEARCH...")
+                    print("🤖 LLM Orchestrator: File Search returned no results, falling back to WEB_SEARCH...")
                 
                 # Fallback to Web Search
-                web_result = await run_web_search(user_question)
+                web_result = await web_task
                 return f"📁 File Search Agent Response:\n{file_result}\n\n🌐 Web Search Agent Response:\n{web_result}"
             else:
                 # File Search found something useful
+                web_task.cancel()
                 return f"📁 File Search Agent Response:\n{file_result}"
         
         else:
             return "❌ Error: Unknown agent type"
     
     except Exception as e:
-        return f"❌ Error routing to {agent_type} agent: {str(e)}"
+        return f"❌ Error routing to {agent_type} agent: {e}"
 
-async def llm_orchestrate_request_streaming(user_question: str, vector_store_ids: List[str] = None, ui_mode: bool = False, stream_callback=None) -> str:
+async def llm_orchestrate_request_streaming(user_question: str, vector_store_ids: Optional[Sequence[str]] = None, ui_mode: bool = False, stream_callback=None, context: Optional[str] = None) -> str:
     """Orchestrate the request with streaming support."""
     if vector_store_ids is None:
-        vector_store_ids = ["vs_689ca12932cc8191a0223ebc3a1d6116"]
+        vector_store_ids = DEFAULT_VECTOR_STORE_IDS
+    # Agents see the conversation summary; routing looks at the request alone
+    agent_input = _with_context(user_question, context)
     
     if stream_callback:
         stream_callback("🤖 Analyzing your request...")
@@ -159,26 +312,55 @@ async def llm_orchestrate_request_streaming(user_question: str, vector_store_ids
         if agent_type == "TICKET":
             if stream_callback:
                 stream_callback("🎫 Routing to Ticket Agent...")
-            result = await run_ticket_creation_streaming(user_question, stream_callback)
+            result = await run_ticket_creation_streaming(agent_input, stream_callback)
             return f"🎫 Ticket Agent Response:\n{result}"
         
         elif agent_type == "FILE_SEARCH":
             if stream_callback:
                 stream_callback("📁 Starting with File Search Agent...")
             
-            # Try File Search first
-            file_result = await run_file_search_streaming(user_question, vector_store_ids, stream_callback)
+            # Start Web Search speculatively; its updates are held back until it is needed
+            web_callback = _DeferredCallback(stream_callback) if stream_callback else None
+            web_task = asyncio.create_task(run_web_search_streaming(agent_input, web_callback))
             
+            # Try File Search first, watching its stream so a miss can cut it short
+            not_found = asyncio.Event()
+            file_task = asyncio.create_task(
+                run_file_search_streaming(agent_input, vector_store_ids, _MissDetector(stream_callback, not_found))
+            )
+            miss_task = asyncio.create_task(not_found.wait())
+            try:
+                await asyncio.wait({file_task, miss_task}, return_when=asyncio.FIRST_COMPLETED)
+            except BaseException:
+                file_task.cancel()
+                web_task.cancel()
+                raise
+            finally:
+                miss_task.cancel()
+
+            if file_task.done():
+                try:
+                    file_result = file_task.result()
+                except BaseException:
+                    web_task.cancel()
+                    raise
+            else:
+                # Miss already streamed past; stop File Search and report it the way the agent would
+                file_task.cancel()
+                file_result = "Not found in repository."
+
             # Check if File Search found something useful
-            if "Not found in repository" in file_result or "not found" in file_result.lower():
+            if _NOT_FOUND_RE.search(file_result):
                 if stream_callback:
                     stream_callback("🌐 File Search returned no results, falling back to Web Search...")
+                    web_callback.release()
                 
                 # Fallback to Web Search
-                web_result = await run_web_search_streaming(user_question, stream_callback)
+                web_result = await web_task
                 return f"📁 File Search Agent Response:\n{file_result}\n\n🌐 Web Search Agent Response:\n{web_result}"
             else:
                 # File Search found something useful
+                web_task.cancel()
                 return f"📁 File Search Agent Response:\n{file_result}"
         
         else:
@@ -188,39 +370,61 @@ async def llm_orchestrate_request_streaming(user_question: str, vector_store_ids
             return error_msg
     
     except Exception as e:
-        error_msg = f"❌ Error routing to {agent_type} agent: {str(e)}"
+        error_msg = f"❌ Error routing to {agent_type} agent: {e}"
         if stream_callback:
             stream_callback(error_msg)
         return error_msg
 
-async def llm_orchestrator_repl(vector_store_ids: List[str] = None):
+async def llm_orchestrator_repl(vector_store_ids: Optional[Sequence[str]] = None):
     """Interactive REPL for the LLM orchestrator."""
     if vector_store_ids is None:
-        vector_store_ids = ["vs_689ca12932cc8191a0223ebc3a1d6116"]
+        vector_store_ids = DEFAULT_VECTOR_STORE_IDS
     
     print("🤖 LLM-Powered Agent Orchestrator (UK) — type 'exit' to quit.")
     print("Available agents: WebSearch, FileSearch, TicketCreation")
     print("The LLM will intelligently route your requests to the best agent.")
     
-    while True:
-        try:
-            question = input("\nYou: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            print("\nBye!")
-            return
-        if not question:
-            continue
-        if question.lower() in {"exit", "quit"}:
-            print("Bye!")
-            return
+    # Build the agents in the background while the user types their first question
+    warmup = asyncio.gather(
+        asyncio.to_thread(build_llm_orchestrator),
+        asyncio.to_thread(build_file_search_agent, vector_store_ids),
+        return_exceptions=True,
+    )
+    
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                # Read on a worker thread so the event loop keeps running while the user types
+                question = (await loop.run_in_executor(None, input, "\nYou: ")).strip()
+            except (EOFError, KeyboardInterrupt):
+                print("\nBye!")
+                return
+            if not question:
+                continue
+            if question.lower() in {"exit", "quit"}:
+                print("Bye!")
+                return
 
-        result = await llm_orchestrate_request(question, vector_store_ids)
-        print(f"\n{result}")
+            # The agents are built before first use (a failed build is simply retried by the call)
+            await warmup
+            result = await llm_orchestrate_request(question, vector_store_ids)
+            print(f"\n{result}")
+    finally:
+        # Don't leave the build pending (or its outcome unretrieved) when the REPL ends
+        warmup.cancel()
 
 # -----------------------------
 #              CLI
 # -----------------------------
 if __name__ == "__main__":
+    # --- Optional faster event loop (safe if uvloop isn't installed) ---
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
     import argparse
 
     parser = argparse.ArgumentParser(description="LLM-Powered Agent Orchestrator - uses AI to route requests intelligently.")
@@ -228,7 +432,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "--vector-store-id",
         action="append",
-        default=["vs_689ca12932cc8191a0223ebc3a1d6116"],
+        default=list(DEFAULT_VECTOR_STORE_IDS),
         help="Vector store ID(s) for FileSearch (can repeat).",
     )
     args = parser.parse_args()
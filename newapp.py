@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 IT Help Agent (UK):
-- Answers from FileSearch first.
+- Answers from FileSearch first (WebSearch runs alongside it speculatively).
 - Falls back to WebSearch with a clear prefix if the repo lacks the answer.
 - Can create ServiceNow incidents via a FunctionTool (with confirmation, redaction, retries).
 
@@ -19,44 +19,40 @@ Env:
 import os
 import re
 import sys
-import json
+import math
 import time
+import uuid
+import base64
+import asyncio
 import hashlib
-from typing import Optional, Literal, Any, Dict
+import functools
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Literal, Any, Dict, List, Tuple
 
-# --- Optional .env loader (safe if python-dotenv isn't installed) ---
-try:
-    if os.path.exists(".env"):
-        from dotenv import load_dotenv  # type: ignore
-        load_dotenv()
-except Exception:
-    pass
-
-import requests
-from pydantic import BaseModel, Field
-
-# ------------------------------------------------------------
-# Import the Agents SDK you are using (the 'agents' package)
-# ------------------------------------------------------------
-try:
-    from agents import Agent, FileSearchTool, Runner, WebSearchTool  # type: ignore
-except Exception as e:
-    raise RuntimeError(
-        "Could not import your 'agents' SDK. Ensure the 'agents' package "
-        "is installed and provides Agent, FileSearchTool, Runner, WebSearchTool."
-    ) from e
-
-# FunctionTool import (two common locations)
+if TYPE_CHECKING:
+    import httpx
+
+# --- Optional .env loader (shared, runs once per process, skipped if already configured) ---
+from _env import OPENAI_VARS, SERVICENOW_VARS, ensure_env
+ensure_env(OPENAI_VARS + SERVICENOW_VARS)
+
+from _config import DEFAULT_VECTOR_STORE_IDS
+from _http_client import close_client, get_client
+from _servicenow import MAX_ATTEMPTS, RETRY_STATUSES, idem_cache_get, idem_cache_put, idempotency_tag, retry_delay
+
+from pydantic import BaseModel, Field, ValidationError
+
+from _bootstrap import Agent, FunctionTool, Runner, json_bytes, json_loads, json_pretty, parse_args
+
+# --- Optional multi-pattern scanner for redaction (safe if hyperscan isn't installed) ---
 try:
-    from agents import FunctionTool  # type: ignore
-except Exception:
-    try:
-        from agents.tools import FunctionTool  # type: ignore
-    except Exception as e:
-        raise RuntimeError(
-            "Your 'agents' SDK does not expose FunctionTool. Please upgrade "
-            "to a version that includes FunctionTool."
-        ) from e
+    import hyperscan  # type: ignore
+except ImportError:
+    hyperscan = None
+
+# Specialised search agents, raced by the search_both tool
+from file_search_agent import run_file_search
+from web_search_agent import run_web_search
 
 
 # -----------------------------
@@ -74,15 +70,17 @@ POLICY:
    - "need help", "need support", "steps didn't work"
    - "report issue", "report problem", "submit ticket"
    
-   RESPONSE: Immediately ask for ticket details (skip FileSearch/WebSearch):
+   RESPONSE: Immediately ask for ticket details (skip search_both):
    - short_description (one line)
    - description (2–4 lines max) 
    - impact (1=High, 2=Medium, 3=Low)
    - urgency (1=High, 2=Medium, 3=Low)
    
    Then call 'create_servicenow_incident' tool when details provided.
+   When the user lists several separate issues, call 'create_servicenow_incidents' ONCE with all of them.
 
-2) For all other questions: Use FileSearchTool FIRST, then WebSearchTool if needed.
+2) For all other questions: call 'search_both' once. It answers from the repository when it can
+   and otherwise returns web results prefixed "Web search:" - say so when you use them.
 
 3) Never invent details. If information is missing, ask ONE concise follow-up question to fill it.
 
@@ -93,31 +91,96 @@ POLICY:
 When using tools, pass strictly valid JSON that matches the tool schema.
 """
 
+# Ticket trigger phrases from the policy above, checked locally before any LLM call
+_TICKET_INTENT_RE = re.compile(
+    r"\b(?:create (?:a )?ticket|make a ticket|open a ticket|laptop not working|computer not working"
+    r"|system not working|need (?:help|support)|steps didn'?t work|report (?:issue|problem)|submit ticket)\b",
+    re.IGNORECASE,
+)
+
+# Requests that already carry ticket fields still go to the agent so it can call the tool
+_TICKET_FIELDS_RE = re.compile(r"\b(?:short[_ ]description|description|impact|urgency)\b", re.IGNORECASE)
+
+TICKET_DETAILS_PROMPT = """I can raise a ServiceNow ticket for you. Please provide:
+- short_description (one line)
+- description (2–4 lines max)
+- impact (1=High, 2=Medium, 3=Low)
+- urgency (1=High, 2=Medium, 3=Low)"""
+
+
+def _needs_ticket_details(question: str) -> bool:
+    """True for ticket requests that have no details yet, which need no LLM round-trip."""
+    return bool(_TICKET_INTENT_RE.search(question)) and not _TICKET_FIELDS_RE.search(question)
+
 # -----------------------------
 #       ServiceNow tool
 # -----------------------------
 
+# Secret patterns, compiled once into a single alternation
+_REDACT_PATTERNS = (
+    r"(?:password|pass|secret|api[_\- ]?key|token)\s*[:=]\s*[^\s,;]+",
+    r"bearer\s+[a-z0-9\.\-_]+",
+    r"ssh-rsa\s+[a-z0-9\+\/=]+",
+)
+_REDACT_RE = re.compile("|".join(_REDACT_PATTERNS), re.IGNORECASE)
+_NON_SPACE_RE = re.compile(r"\S")
+
+# Long texts (transcripts, pasted logs) are scanned by Hyperscan when available
+_HYPERSCAN_MIN_LEN = 1024
+_REDACT_DB = None
+if hyperscan is not None:
+    try:
+        _REDACT_DB = hyperscan.Database()
+        _REDACT_DB.compile(
+            expressions=[p.encode("ascii") for p in _REDACT_PATTERNS],
+            ids=list(range(len(_REDACT_PATTERNS))),
+            elements=len(_REDACT_PATTERNS),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST | hyperscan.HS_FLAG_UTF8]
+            * len(_REDACT_PATTERNS),
+        )
+    except Exception:
+        _REDACT_DB = None
+
+
+def _redact_secrets_hyperscan(text: str) -> str:
+    """Single-pass redaction: collect every match span, then mask their union."""
+    data = text.encode("utf-8")
+    spans: List[Tuple[int, int]] = []
+
+    def on_match(_id, start, end, _flags, _context):
+        spans.append((start, end))
+
+    _REDACT_DB.scan(data, match_event_handler=on_match)
+    if not spans:
+        return text
+
+    spans.sort()
+    out: List[str] = []
+    pos = 0
+    cur_start, cur_end = spans[0]
+    for start, end in spans[1:] + [(len(data) + 1, len(data) + 1)]:
+        if start <= cur_end:
+            cur_end = max(cur_end, end)
+            continue
+        out.append(data[pos:cur_start].decode("utf-8"))
+        out.append(_NON_SPACE_RE.sub("•", data[cur_start:cur_end].decode("utf-8")))
+        pos = cur_end
+        cur_start, cur_end = start, end
+    out.append(data[pos:].decode("utf-8"))
+    return "".join(out)
+
+
 def _redact_secrets(text: str) -> str:
     """Basic redaction for obvious secrets."""
     if not text:
         return text
-    patterns = [
-        r"(?i)(password|pass|secret|api[_\- ]?key|token)\s*[:=]\s*[^\s,;]+",
-        r"(?i)(bearer\s+[a-z0-9\.\-_]+)",
-        r"(?i)(ssh-rsa\s+[a-z0-9\+\/=]+)",
-    ]
-    redacted = text
-    for pat in patterns:
-        redacted = re.sub(pat, lambda m: re.sub(r"\S", "•", m.group(0)), redacted)
-    return redacted
+    if _REDACT_DB is not None and len(text) >= _HYPERSCAN_MIN_LEN:
+        return _redact_secrets_hyperscan(text)
+    return _REDACT_RE.sub(lambda m: _NON_SPACE_RE.sub("•", m.group(0)), text)
 
 
-def _idempotency_tag(caller: Optional[str], short_description: str) -> str:
-    """Create a lightweight idempotency tag to help de-duplicate downstream."""
-    h = hashlib.sha256()
-    base = (caller or "unknown") + "|" + short_description.strip()
-    h.update(base.encode("utf-8"))
-    return h.hexdigest()[:12]
+class SearchArgs(BaseModel):
+    question: str = Field(..., description="The user's question, restated if needed")
 
 
 class CreateIncidentArgs(BaseModel):
@@ -130,7 +193,21 @@ class CreateIncidentArgs(BaseModel):
     category: Optional[str] = None          # e.g., "Hardware", "Software"
 
 
-def create_servicenow_incident(
+class CreateIncidentsArgs(BaseModel):
+    incidents: List[CreateIncidentArgs] = Field(..., min_length=1)
+
+
+def _sn_credentials() -> Optional[Tuple[str, str, str]]:
+    """Return (instance, user, password) from the environment, or None if incomplete."""
+    sn_instance = os.environ.get("SN_INSTANCE")
+    sn_user = os.environ.get("SN_USER")
+    sn_pass = os.environ.get("SN_PASS")
+    if not all([sn_instance, sn_user, sn_pass]):
+        return None
+    return sn_instance, sn_user, sn_pass
+
+
+def _incident_payload(
     short_description: str,
     description: str,
     urgency: str = "3",
@@ -138,24 +215,15 @@ def create_servicenow_incident(
     caller: Optional[str] = None,
     assignment_group: Optional[str] = None,
     category: Optional[str] = None,
-) -> Dict[str, Any]:
-    """POST to ServiceNow /api/now/table/incident with simple retries."""
-    sn_instance = os.environ.get("SN_INSTANCE")
-    sn_user = os.environ.get("SN_USER")
-    sn_pass = os.environ.get("SN_PASS")
-
-    if not all([sn_instance, sn_user, sn_pass]):
-        return {"error": "ServiceNow credentials missing (SN_INSTANCE, SN_USER, SN_PASS)."}
-
-    url = f"https://{sn_instance}.service-now.com/api/now/table/incident"
-
+    scope: Optional[str] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """Build a redacted incident payload and its idempotency tag (over the whole payload and scope)."""
     safe_desc = _redact_secrets(description)
     safe_short = _redact_secrets(short_description)
 
-    idem = _idempotency_tag(caller, safe_short)
     payload = {
         "short_description": safe_short,
-        "description": f"{safe_desc}\n\n[idempotency:{idem}]",
+        "description": safe_desc,
         "urgency": urgency,
         "impact": impact,
     }
@@ -165,91 +233,453 @@ def create_servicenow_incident(
         payload["assignment_group"] = assignment_group
     if category:
         payload["category"] = category
+    idem = idempotency_tag(payload, scope)
+    payload["description"] = f"{safe_desc}\n\n[idempotency:{idem}]"
+    return payload, idem
+
+
+def _incident_result(sn_instance: str, data: Dict[str, Any], idem: str) -> Dict[str, Any]:
+    """Summarise a created incident record for the agent."""
+    return {
+        "number": data.get("number"),
+        "sys_id": data.get("sys_id"),
+        "url": f"https://{sn_instance}.service-now.com/nav_to.do?uri=incident.do?sys_id={data.get('sys_id')}",
+        "idempotency": idem,
+    }
+
 
+async def _sn_post(
+    client: "httpx.AsyncClient",
+    url: str,
+    payload: Dict[str, Any],
+    auth: Tuple[str, str],
+    idempotency_key: Optional[str] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """POST JSON to ServiceNow, retrying transient failures; returns (response body, last error)."""
+    import httpx  # already loaded by get_client(); imported here for its exception types
+
+    headers = {"X-Idempotency-Key": idempotency_key} if idempotency_key else None
+    data = json_bytes(payload)
     attempts = 0
     last_error = None
-    while attempts < 3:
+    while attempts < MAX_ATTEMPTS:
         attempts += 1
+        retry_after = None
         try:
-            r = requests.post(
-                url,
-                json=payload,
-                auth=(sn_user, sn_pass),
-                headers={"Accept": "application/json"},
-                timeout=15,
-            )
-            # retry on transient issues
-            if r.status_code in (429, 500, 502, 503, 504):
-                time.sleep(1.5 * attempts)
-                continue
-            r.raise_for_status()
-            data = r.json().get("result", {})
-            return {
-                "number": data.get("number"),
-                "sys_id": data.get("sys_id"),
-                "url": f"https://{sn_instance}.service-now.com/nav_to.do?uri=incident.do?sys_id={data.get('sys_id')}",
-                "idempotency": idem,
-            }
-        except Exception as ex:
+            r = await client.post(url, content=data, headers=headers, auth=auth)
+        except httpx.TransportError as ex:
+            # connection failures and timeouts are worth another try
             last_error = f"{type(ex).__name__}: {ex}"
-            time.sleep(1.0 * attempts)
+        except Exception as ex:
+            return None, f"{type(ex).__name__}: {ex}"
+        else:
+            # retry on transient issues; any other response is final, and a created record mustn't be POSTed again
+            if r.status_code not in RETRY_STATUSES:
+                if r.is_error:
+                    return None, f"HTTP {r.status_code}"
+                try:
+                    return json_loads(r.content), None
+                except ValueError as ex:
+                    return None, f"Unreadable ServiceNow response (HTTP {r.status_code}): {ex}"
+            retry_after = r.headers.get("Retry-After")
+            last_error = f"HTTP {r.status_code}"
+        if attempts < MAX_ATTEMPTS:
+            await asyncio.sleep(retry_delay(attempts, retry_after))
+
+    return None, last_error
+
+
+async def create_servicenow_incident(
+    short_description: str,
+    description: str,
+    urgency: str = "3",
+    impact: str = "3",
+    caller: Optional[str] = None,
+    assignment_group: Optional[str] = None,
+    category: Optional[str] = None,
+    scope: Optional[str] = None,
+) -> Dict[str, Any]:
+    """POST to ServiceNow /api/now/table/incident with simple retries.
+
+    A repeat of the same payload within the same ``scope`` (e.g. a chat session) returns the earlier incident.
+    """
+    creds = _sn_credentials()
+    if creds is None:
+        return {"error": "ServiceNow credentials missing (SN_INSTANCE, SN_USER, SN_PASS)."}
+    sn_instance, sn_user, sn_pass = creds
 
-    return {"error": f"ServiceNow API failed after retries. Detail: {last_error}"}
+    url = f"https://{sn_instance}.service-now.com/api/now/table/incident"
+    payload, idem = _incident_payload(
+        short_description, description, urgency, impact, caller, assignment_group, category, scope
+    )
+    cached = idem_cache_get(idem)
+    if cached is not None:
+        return cached
+
+    client = get_client()
+    body, last_error = await _sn_post(client, url, payload, (sn_user, sn_pass), idem)
+    if body is None:
+        return {"error": f"ServiceNow API request failed. Detail: {last_error}"}
+    result = _incident_result(sn_instance, body.get("result", {}), idem)
+    idem_cache_put(idem, result)
+    return result
+
+
+# Headers for each sub-request inside a Batch API call
+_BATCH_HEADERS = [
+    {"name": "Content-Type", "value": "application/json"},
+    {"name": "Accept", "value": "application/json"},
+]
+
+
+async def create_servicenow_incidents(incidents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Create several incidents in one POST to ServiceNow's /api/now/v1/batch."""
+    if not incidents:
+        return []
+    creds = _sn_credentials()
+    if creds is None:
+        return [{"error": "ServiceNow credentials missing (SN_INSTANCE, SN_USER, SN_PASS)."}] * len(incidents)
+    sn_instance, sn_user, sn_pass = creds
+
+    url = f"https://{sn_instance}.service-now.com/api/now/v1/batch"
+    prepared = [_incident_payload(**incident) for incident in incidents]
+    results: List[Optional[Dict[str, Any]]] = [idem_cache_get(idem) for _payload, idem in prepared]
+    # Only incidents not created recently go to ServiceNow
+    pending = [i for i, cached in enumerate(results) if cached is None]
+    if not pending:
+        return results
+    batch = {
+        "batch_request_id": uuid.uuid4().hex,
+        "rest_requests": [
+            {
+                "id": str(i),
+                "method": "POST",
+                "url": "/api/now/table/incident",
+                "headers": _BATCH_HEADERS,
+                "body": base64.b64encode(json_bytes(prepared[i][0])).decode("ascii"),
+            }
+            for i in pending
+        ],
+    }
+
+    client = get_client()
+    body, last_error = await _sn_post(client, url, batch, (sn_user, sn_pass), batch["batch_request_id"])
+    if body is None:
+        for i in pending:
+            results[i] = {"error": f"ServiceNow API request failed. Detail: {last_error}"}
+        return results
+
+    for i in pending:
+        results[i] = {"error": "Not serviced by the ServiceNow batch API."}
+    for item in body.get("serviced_requests", []):
+        try:
+            i = int(item["id"])
+            if i not in pending:
+                continue
+            status = int(item.get("status_code", 0))
+            if 200 <= status < 300:
+                data = json_loads(base64.b64decode(item.get("body", ""))).get("result", {})
+                results[i] = _incident_result(sn_instance, data, prepared[i][1])
+                idem_cache_put(prepared[i][1], results[i])
+            else:
+                results[i] = {"error": f"ServiceNow returned HTTP {status}: {item.get('status_text', '')}".strip()}
+        except Exception:
+            continue
+    return results
 
 
 # -----------------------------
 #    Tool registration
 # -----------------------------
 
-def build_tools(vector_store_ids):
-    """Return tools list as proper tool objects (no dicts)."""
-    fs_tool = FileSearchTool(max_num_results=3, vector_store_ids=vector_store_ids)
-    ws_tool = WebSearchTool()
+# Tool schemas, generated once rather than per agent build
+_SEARCH_SCHEMA = SearchArgs.model_json_schema()
+_CREATE_INCIDENT_SCHEMA = CreateIncidentArgs.model_json_schema()
+_CREATE_INCIDENTS_SCHEMA = CreateIncidentsArgs.model_json_schema()
+
+# File Search reports misses as "Not found in repository."
+_NOT_FOUND_RE = re.compile(r"not found", re.IGNORECASE)
+
+
+async def search_both(question: str, vector_store_ids) -> str:
+    """Search the repository and the web concurrently, preferring the repository answer."""
+    # Start Web Search speculatively so the fallback is already in flight
+    web_task = asyncio.create_task(run_web_search(question))
+    try:
+        file_result = await run_file_search(question, vector_store_ids)
+    except asyncio.CancelledError:
+        web_task.cancel()
+        raise
+    except Exception:
+        # The repository search failed; the web answer is the fallback
+        return f"Web search:\n{await web_task}"
+
+    if _NOT_FOUND_RE.search(file_result):
+        web_result = await web_task
+        return f"Web search:\n{web_result}"
+    web_task.cancel()
+    return file_result
+
+
+@functools.lru_cache(maxsize=4)
+def build_tools(vector_store_ids: Tuple[str, ...]):
+    """Return tools list as proper tool objects (no dicts), built once per vector store set."""
+    async def on_invoke_search(tool_context, args):
+        """Wrapper to validate the question, then race repository and web search for it."""
+        try:
+            model = parse_args(SearchArgs, args)
+        except ValidationError as e:
+            return {"error": f"Invalid search request: {e}"}
+        return await search_both(model.question, vector_store_ids)
+
+    search_tool = FunctionTool(
+        name="search_both",
+        description="Answer a question from the knowledge repository, falling back to web search.",
+        params_json_schema=_SEARCH_SCHEMA,
+        on_invoke_tool=on_invoke_search
+    )
 
     # Create FunctionTool using the correct constructor pattern
     async def on_invoke_tool(tool_context, args):
-        """Wrapper to handle the function call with proper argument parsing."""
-        import json
-        if isinstance(args, str):
-            args = json.loads(args)
-        return create_servicenow_incident(**args)
+        """Wrapper to validate the tool arguments in one pass and create the incident."""
+        try:
+            model = parse_args(CreateIncidentArgs, args)
+        except ValidationError as e:
+            return {"error": f"Invalid ticket details: {e}"}
+        return await create_servicenow_incident(**model.model_dump(exclude_none=True))
     
     create_ticket_tool = FunctionTool(
         name="create_servicenow_incident",
         description="Create a ServiceNow incident (use only after user confirms).",
-        params_json_schema=CreateIncidentArgs.model_json_schema(),
+        params_json_schema=_CREATE_INCIDENT_SCHEMA,
         on_invoke_tool=on_invoke_tool
     )
 
-    return [ws_tool, fs_tool, create_ticket_tool]
+    async def on_invoke_batch(tool_context, args):
+        """Wrapper to validate the tool arguments and create the incidents in one batch call."""
+        try:
+            model = parse_args(CreateIncidentsArgs, args)
+        except ValidationError as e:
+            return {"error": f"Invalid ticket details: {e}"}
+        return await create_servicenow_incidents([i.model_dump(exclude_none=True) for i in model.incidents])
+
+    create_tickets_tool = FunctionTool(
+        name="create_servicenow_incidents",
+        description="Create several ServiceNow incidents in one call (use only after user confirms).",
+        params_json_schema=_CREATE_INCIDENTS_SCHEMA,
+        on_invoke_tool=on_invoke_batch
+    )
+
+    return [search_tool, create_ticket_tool, create_tickets_tool]
+
+
+# -----------------------------
+#        Response cache
+# -----------------------------
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+_EMBED_CACHE_SIZE = 4096
+
+# --- Optional on-disk embedding cache (safe if diskcache isn't installed) ---
+try:
+    from diskcache import Cache as _DiskCache  # type: ignore
+except ImportError:
+    _DiskCache = None
+
+
+class SemanticCache:
+    """In-memory answer cache keyed by question embedding, matched by cosine similarity."""
+
+    def __init__(self, threshold: float = 0.92, ttl: float = 3600.0, max_entries: int = 512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: List[Tuple[Tuple[float, ...], str, str, float]] = []  # (unit vector, question, answer, ts)
+        self._client = None
+        # Embeddings of recent questions, keyed by SHA-256 of the normalised text
+        self._embeddings: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        self._disk = None
+        if _DiskCache is not None:
+            try:
+                self._disk = _DiskCache(".embed_cache")
+            except Exception:
+                self._disk = None
+
+    async def embed(self, text: str) -> Optional[Tuple[float, ...]]:
+        """Embed text as a unit vector, or None if embeddings are unavailable."""
+        key = hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+        vec = self._embeddings.get(key)
+        if vec is None and self._disk is not None:
+            vec = self._disk.get(key)
+        if vec is None:
+            vec = await self._embed_remote(text)
+            if vec is None:
+                return None
+            if self._disk is not None:
+                self._disk.set(key, vec)
+        self._embeddings[key] = vec
+        self._embeddings.move_to_end(key)
+        if len(self._embeddings) > _EMBED_CACHE_SIZE:
+            self._embeddings.popitem(last=False)
+        return vec
+
+    async def _embed_remote(self, text: str) -> Optional[Tuple[float, ...]]:
+        """Call the embeddings endpoint and normalise the result."""
+        try:
+            if self._client is None:
+                from openai import AsyncOpenAI  # type: ignore
+                self._client = AsyncOpenAI()
+            resp = await self._client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+            vec = resp.data[0].embedding
+        except Exception:
+            return None
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        return tuple(x / norm for x in vec)
+
+    def get(self, vec: Tuple[float, ...]) -> Optional[str]:
+        """Return the freshest answer whose question is similar enough, if any."""
+        now = time.monotonic()
+        self._entries = [e for e in self._entries if now - e[3] < self.ttl]
+        best, best_score = None, self.threshold
+        for e_vec, _question, answer, _ts in self._entries:
+            score = sum(a * b for a, b in zip(vec, e_vec))
+            if score >= best_score:
+                best, best_score = answer, score
+        return best
+
+    def put(self, vec: Tuple[float, ...], question: str, answer: str) -> None:
+        """Store an answer, evicting the oldest entry when full."""
+        self._entries.append((vec, question, answer, time.monotonic()))
+        if len(self._entries) > self.max_entries:
+            self._entries.pop(0)
+
+
+_RESPONSE_CACHE = SemanticCache()
+
+# Answers that mention tickets may reflect a side effect, so they are never replayed
+_TICKET_MENTION_RE = re.compile(r"\b(?:ticket|incident)", re.IGNORECASE)
+
+
+def _is_cacheable(question: str, answer: str) -> bool:
+    """Skip ticket turns and anything carrying secrets."""
+    return not (
+        _TICKET_INTENT_RE.search(question)
+        or _TICKET_FIELDS_RE.search(question)
+        or _REDACT_RE.search(question)
+        or _TICKET_MENTION_RE.search(answer)
+    )
 
 
 # -----------------------------
 #        Agent + Runner
 # -----------------------------
 
-def build_agent(vector_store_ids):
+@functools.lru_cache(maxsize=4)
+def _build_agent(vector_store_ids: Tuple[str, ...]):
+    """Build (once per vector store set) the IT help agent."""
     tools = build_tools(vector_store_ids)
-    agent = Agent(
-        name="Assistant",
-        tools=tools,
-        # If your Agent constructor supports 'instructions', you can put the policy here:
-        # instructions=STRICT_INSTRUCTIONS,
-    )
+    try:
+        # Policy as system instructions, so the provider can cache the static prefix
+        agent = Agent(name="Assistant", tools=tools, instructions=STRICT_INSTRUCTIONS)
+    except TypeError:
+        agent = Agent(name="Assistant", tools=tools)
     return agent
 
 
-async def run_once(question: str, vector_store_ids):
-    agent = build_agent(vector_store_ids)
-    full_prompt = f"{STRICT_INSTRUCTIONS}\n\nQuestion: {question}"
-    result = await Runner.run(agent, full_prompt)
+def build_agent(vector_store_ids):
+    return _build_agent(tuple(vector_store_ids))
 
-    # Be flexible about result shape
-    out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
+
+# Everything before the question is fixed, so it is joined once
+PROMPT_PREFIX = f"{STRICT_INSTRUCTIONS}\n\nQuestion: "
+
+
+def build_prompt(agent, question: str) -> str:
+    """Agents carrying the policy as instructions only need the question."""
+    return question if getattr(agent, "instructions", None) else PROMPT_PREFIX + question
+
+
+# Which result attribute this SDK version fills in, learned on the first run
+_RESULT_ATTR: Optional[str] = None
+
+
+def _extract_output(result: Any) -> Any:
+    """Return the agent's output, being flexible about the result shape."""
+    global _RESULT_ATTR
+    if _RESULT_ATTR is not None:
+        value = getattr(result, _RESULT_ATTR, None)
+        if value is not None:
+            return value
+    # Unknown yet, or empty on this run: check every attribute before giving up
+    for attr in ("final_output", "output_text"):
+        value = getattr(result, attr, None)
+        if value is not None:
+            _RESULT_ATTR = attr
+            return value
+    return result
+
+
+def _print_output(prefix: str, out: Any) -> None:
+    """Print an agent output, pretty-printing anything that isn't text."""
     try:
-        print(out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2))
+        print(prefix + (out if isinstance(out, str) else json_pretty(out)))
     except Exception:
-        print(str(out))
+        print(prefix + str(out))
+
+
+async def run_and_print(agent, full_prompt: str, prefix: str = "") -> Any:
+    """Run the agent, echoing its text to stdout as it streams; returns the final output."""
+    if not hasattr(Runner, "run_streamed"):
+        result = await Runner.run(agent, full_prompt)
+        out = _extract_output(result)
+        _print_output(prefix, out)
+        return out
+
+    streamed = Runner.run_streamed(agent, full_prompt)
+    printed = False
+    async for event in streamed.stream_events():
+        if event.type == "raw_response_event" and getattr(event.data, "type", None) == "response.output_text.delta":
+            if not printed:
+                sys.stdout.write(prefix)
+                printed = True
+            sys.stdout.write(event.data.delta)
+            sys.stdout.flush()
+
+    out = streamed.final_output
+    if printed:
+        sys.stdout.write("\n")
+    else:
+        _print_output(prefix, out)
+    return out
+
+
+async def run_once(question: str, vector_store_ids):
+    if _needs_ticket_details(question):
+        print(TICKET_DETAILS_PROMPT)
+        return
+
+    agent = build_agent(vector_store_ids)
+    full_prompt = build_prompt(agent, question)
+    await run_and_print(agent, full_prompt)
+
+
+async def run_batch(questions: List[str], vector_store_ids, concurrency: int = 8):
+    """Answer several questions concurrently with one shared agent, printing answers in order."""
+    agent = build_agent(vector_store_ids)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def answer(question: str):
+        if _needs_ticket_details(question):
+            return TICKET_DETAILS_PROMPT
+        async with sem:
+            result = await Runner.run(agent, build_prompt(agent, question))
+        return _extract_output(result)
+
+    outputs = await asyncio.gather(*(answer(q) for q in questions), return_exceptions=True)
+    for question, out in zip(questions, outputs):
+        if isinstance(out, BaseException):
+            out = f"❌ Error: {out}"
+        _print_output(f"\nQ: {question}\nA: ", out)
 
 
 async def repl(vector_store_ids):
@@ -257,7 +687,8 @@ async def repl(vector_store_ids):
     agent = build_agent(vector_store_ids)
     while True:
         try:
-            question = input("\nYou: ").strip()
+            # Read on a worker thread so the event loop keeps running while the user types
+            question = (await asyncio.to_thread(input, "\nYou: ")).strip()
         except (EOFError, KeyboardInterrupt):
             print("\nBye!")
             return
@@ -266,31 +697,45 @@ async def repl(vector_store_ids):
         if question.lower() in {"exit", "quit"}:
             print("Bye!")
             return
+        if _needs_ticket_details(question):
+            print("\nAssistant:", TICKET_DETAILS_PROMPT)
+            continue
 
-        full_prompt = f"{STRICT_INSTRUCTIONS}\n\nQuestion: {question}"
-        result = await Runner.run(agent, full_prompt)
-        out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
-        try:
-            print("\nAssistant:", out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2))
-        except Exception:
-            print("\nAssistant:", str(out))
+        # Similar questions asked earlier in the session reuse their answer
+        vec = await _RESPONSE_CACHE.embed(question)
+        cached = _RESPONSE_CACHE.get(vec) if vec is not None else None
+        if cached is not None:
+            print("\nAssistant:", cached)
+            continue
+
+        full_prompt = build_prompt(agent, question)
+        out = await run_and_print(agent, full_prompt, "\nAssistant: ")
+        if vec is not None and isinstance(out, str) and _is_cacheable(question, out):
+            _RESPONSE_CACHE.put(vec, question, out)
 
 
 # -----------------------------
 #              CLI
 # -----------------------------
 if __name__ == "__main__":
+    # --- Optional faster event loop (safe if uvloop isn't installed) ---
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
     import argparse
-    import asyncio
 
     parser = argparse.ArgumentParser(description="IT Help Agent with FileSearch, Web fallback, and ServiceNow ticketing.")
     parser.add_argument("question", nargs="*", help="The question to ask.")
     parser.add_argument(
         "--vector-store-id",
         action="append",
-        default=["vs_689ca12932cc8191a0223ebc3a1d6116"],
+        default=list(DEFAULT_VECTOR_STORE_IDS),
         help="Vector store ID(s) for FileSearch (can repeat).",
     )
+    parser.add_argument("--batch-file", help="File of questions, one per line, answered concurrently.")
     args = parser.parse_args()
 
     user_question = " ".join(args.question).strip()
@@ -299,7 +744,18 @@ if __name__ == "__main__":
         print("OPENAI_API_KEY not set. Please export it or add to .env")
         sys.exit(1)
 
-    if user_question:
-        asyncio.run(run_once(user_question, args.vector_store_id))
-    else:
-        asyncio.run(repl(args.vector_store_id))
+    async def main():
+        try:
+            if args.batch_file:
+                with open(args.batch_file, encoding="utf-8") as fh:
+                    questions = [line.strip() for line in fh if line.strip()]
+                await run_batch(questions, args.vector_store_id)
+            elif user_question:
+                await run_once(user_question, args.vector_store_id)
+            else:
+                await repl(args.vector_store_id)
+        finally:
+            # The client belongs to this event loop, so close it before the loop ends
+            await close_client()
+
+    asyncio.run(main())
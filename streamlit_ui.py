@@ -8,13 +8,181 @@ import streamlit as st
 import asyncio
 import sys
 import os
-from typing import List
+import re
+import json
+import time
+import queue
+import atexit
+import logging
+import weakref
+import functools
+import uuid
+import threading
+from collections import OrderedDict, deque
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
 
 # Add the current directory to path to import our agents
 sys.path.insert(0, '.')
 
-# Import the orchestrator
-from llm_orchestrator import llm_orchestrate_request, llm_orchestrate_request_streaming
+# The agent modules pull in the whole OpenAI/agents stack, so they are imported on
+# first use rather than at startup (sys.modules keeps them loaded across reruns)
+def _orchestrator():
+    """The LLM orchestrator module."""
+    import llm_orchestrator
+    return llm_orchestrator
+
+def _ticket_details():
+    """The ticket details interpretation module."""
+    import ticket_details_agent
+    return ticket_details_agent
+
+def _ticket():
+    """The ServiceNow ticket module."""
+    import ticket_agent
+    return ticket_agent
+
+# Chat memory: the last MAX_MESSAGES messages are kept verbatim; once over the limit,
+# the oldest SUMMARIZE_BATCH are folded into a running summary
+MAX_MESSAGES = 20
+SUMMARIZE_BATCH = 10
+
+# --- Optional fragments (Streamlit >= 1.37; older versions rerun the whole script) ---
+_HAS_FRAGMENTS = hasattr(st, "fragment")
+_fragment = st.fragment if _HAS_FRAGMENTS else (lambda fn: fn)
+
+# Console-style progress lines the orchestrator prints, stripped before UI display
+_CONSOLE_PREFIX_RE = re.compile(
+    r"🤖 LLM Orchestrator: (?:Analyzing request\.\.\.|Starting with FILE_SEARCH agent\.\.\."
+    r"|File Search returned no results, falling back to WEB_SEARCH\.\.\.|Routing to TICKET agent\.\.\.)"
+)
+
+# Orchestrator response sections, matched in one pass each
+_RESPONSE_RE = re.compile(
+    r"📁 File Search Agent Response:(?P<file>.*?)(?:🌐 Web Search Agent Response:(?P<web>.*))?$", re.S
+)
+_TICKET_RESPONSE_RE = re.compile(r"🎫 Ticket Agent Response:(?P<ticket>.*?)(?:🎫 Ticket Agent Response:|$)", re.S)
+
+# Page header and chat input placeholders
+_HEADER_HTML = """
+<h1 class="main-header">🤖 IT Help Assistant</h1>
+<div class="agent-info">
+    <h3 style="color: #2c3e50; margin-bottom: 1rem;">🎯 How it works:</h3>
+    <ul style="color: #2c3e50;">
+        <li><strong>📁 File Search First:</strong> Searches internal knowledge repository</li>
+        <li><strong>🌐 Web Search Fallback:</strong> If not found internally, searches the web</li>
+        <li><strong>🎫 Ticket Creation:</strong> Creates ServiceNow tickets when explicitly requested</li>
+    </ul>
+    <p style="color: #2c3e50; font-style: italic; margin-top: 1rem;"><em>Ask me anything about IT support, company procedures, or general questions!</em></p>
+</div>
+"""
+_PLACEHOLDER_DEFAULT = "Ask me anything about IT support, procedures, or create a ticket..."
+_PLACEHOLDER_TICKET = "Provide ticket details (short description, description, impact, urgency)..."
+
+# Chat bubble templates, filled per message
+_USER_HTML = """
+<div class="chat-message user-message">
+    <strong>👤 You:</strong><br>
+    {content}
+</div>
+"""
+_ASSISTANT_OPEN_HTML = """
+<div class="chat-message assistant-message">
+    <strong>🤖 Assistant:</strong><br>
+"""
+_FILE_RESULT_HTML = """
+    <div class="file-search-result">
+        <strong>📁 Internal Knowledge:</strong><br>
+        {content}
+    </div>
+"""
+_WEB_RESULT_HTML = """
+    <div class="web-search-result">
+        <strong>🌐 Web Search:</strong><br>
+        {content}
+    </div>
+"""
+_TICKET_RESULT_HTML = """
+    <div class="ticket-result">
+        <strong>🎫 Ticket Creation:</strong><br>
+        {content}
+    </div>
+"""
+
+# --- Optional fast JSON encoder (safe if orjson isn't installed) ---
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+# --- Optional keyword automaton for the simple ticket parser (safe if pyahocorasick isn't installed) ---
+try:
+    import ahocorasick  # type: ignore
+except ImportError:
+    ahocorasick = None
+
+# Keywords the simple ticket parser looks for, by group; each group sets the flags
+# listed for it (multi-word phrases come first so the regex prefers them)
+_TICKET_KEYWORD_GROUPS = {
+    "high_urgency": ("high urgency",),
+    "medium_urgency": ("medium urgency",),
+    "low_urgency": ("low urgency",),
+    "urgency_low": ("when convenient",),
+    "urgent": ("urgent",),
+    "moderate": ("moderate",),
+    "impact_high": ("high", "critical", "emergency"),
+    "impact_medium": ("medium",),
+    "impact_low": ("low", "minor"),
+    "urgency_high": ("asap", "immediate"),
+    "device": ("laptop", "computer", "pc", "monitor", "screen"),
+}
+_TICKET_KEYWORD_FLAGS = {
+    "high_urgency": ("impact_1", "urgency_1"),
+    "medium_urgency": ("impact_2", "urgency_2"),
+    "low_urgency": ("impact_3", "urgency_3"),
+    "urgency_low": ("urgency_3",),
+    "urgent": ("impact_1", "urgency_1"),
+    "moderate": ("impact_2", "urgency_2"),
+    "impact_high": ("impact_1",),
+    "impact_medium": ("impact_2",),
+    "impact_low": ("impact_3",),
+    "urgency_high": ("urgency_1",),
+    "device": ("device",),
+}
+
+# Pure-Python path: one regex pass, keywords must start at a word boundary
+_TICKET_KEYWORDS_RE = re.compile(r"\b(?:" + "|".join(
+    f"(?P<{group}>{'|'.join(map(re.escape, words))})" for group, words in _TICKET_KEYWORD_GROUPS.items()
+) + ")", re.I)
+
+# Automaton path: the same keywords in a C-level Aho-Corasick automaton, built once
+_TICKET_AUTOMATON = None
+if ahocorasick is not None:
+    _TICKET_AUTOMATON = ahocorasick.Automaton()
+    for _group, _words in _TICKET_KEYWORD_GROUPS.items():
+        for _word in _words:
+            _TICKET_AUTOMATON.add_word(_word, (len(_word), _TICKET_KEYWORD_FLAGS[_group]))
+    _TICKET_AUTOMATON.make_automaton()
+
+_ISSUE_WORD_RE = re.compile(r"broken|won't|doesn't|failed", re.I)
+
+def _ticket_keyword_flags(user_input: str) -> set:
+    """Impact/urgency/device flags for every keyword in the input, in one scan."""
+    flags = set()
+    if _TICKET_AUTOMATON is None:
+        for match in _TICKET_KEYWORDS_RE.finditer(user_input):
+            flags.update(_TICKET_KEYWORD_FLAGS[match.lastgroup])
+        return flags
+    
+    # Overlapping hits ("high" inside "high urgency") only add flags the phrase already sets
+    text = user_input.lower()
+    for end, (length, keyword_flags) in _TICKET_AUTOMATON.iter(text):
+        start = end - length + 1
+        if start == 0 or not (text[start - 1].isalnum() or text[start - 1] == "_"):
+            flags.update(keyword_flags)
+    return flags
 
 # Page configuration
 st.set_page_config(
@@ -29,8 +197,8 @@ st.set_page_config(
     }
 )
 
-# Custom CSS for better styling with improved contrast
-st.markdown("""
+# Custom CSS for better styling with improved contrast, built once per process
+_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -123,7 +291,26 @@ st.markdown("""
         color: white;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def inject_css():
+    """Emit the app stylesheet.
+
+    Streamlit drops any element a rerun doesn't re-create, so this has to run every
+    time; the frontend sees an identical element in the same slot and skips the DOM work.
+    """
+    st.markdown(_CSS, unsafe_allow_html=True)
+
+def _empty_ctx() -> dict:
+    """A fresh conversation context (new chat or cleared history)."""
+    return {
+        "current_agent": None,
+        "waiting_for_ticket_details": False,
+        "ticket_details": {},
+        "conversation_history": [],
+        "summary": None,
+        "_last_parse_hash": None
+    }
 
 def initialize_session_state():
     """Initialize session state variables."""
@@ -134,13 +321,11 @@ def initialize_session_state():
         st.session_state.vector_store_ids = ["vs_68a48bcd776c81918c6ef3db005e1c06"]
     
     # Add conversation context tracking
-    if "conversation_context" not in st.session_state:
-        st.session_state.conversation_context = {
-            "current_agent": None,
-            "waiting_for_ticket_details": False,
-            "ticket_details": {},
-            "conversation_history": []
-        }
+    st.session_state.setdefault("conversation_context", _empty_ctx())
+    
+    # Scopes ticket de-duplication to this browser session
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     
     # Add debug mode
     if "debug_mode" not in st.session_state:
@@ -154,21 +339,201 @@ def initialize_session_state():
     if "use_streaming" not in st.session_state:
         st.session_state.use_streaming = True
 
+# Debug mode: report callbacks that hold the background loop longer than this
+SLOW_CALLBACK_SECONDS = 0.010
+
+class _BlockingCallLog(logging.Handler):
+    """Collects asyncio's slow-callback warnings raised on one loop thread."""
+    
+    def __init__(self, thread_id: int):
+        super().__init__(logging.WARNING)
+        self.set_name("orchestrator-loop-blocking")
+        self._thread_id = thread_id
+        self.records = deque(maxlen=50)
+    
+    def emit(self, record: logging.LogRecord):
+        if record.thread == self._thread_id and str(record.msg).startswith("Executing"):
+            self.records.append(record.getMessage())
+
+# Requests waiting on a session's worker; past this the UI reports busy instead of queueing
+REQUEST_QUEUE_SIZE = 4
+REQUEST_TIMEOUT = 120.0
+
+class _BackgroundLoop:
+    """The process's event loop thread, with its executor and slow-callback log."""
+    
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        # asyncio's debug mode times every callback for every session sharing the loop, so it is fixed at
+        # startup (PYTHONASYNCIODEBUG=1 or -X dev) rather than toggled by one session's sidebar
+        self.loop.set_debug(sys.flags.dev_mode or bool(os.environ.get("PYTHONASYNCIODEBUG")))
+        self.executor = ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 5)
+        self.loop.set_default_executor(self.executor)
+        self.loop.slow_callback_duration = SLOW_CALLBACK_SECONDS
+        self.thread = threading.Thread(target=self.loop.run_forever, name="orchestrator-loop", daemon=True)
+        self.thread.start()
+        
+        # One handler per process, replacing any left by an earlier copy of this module
+        asyncio_log = logging.getLogger("asyncio")
+        for handler in [h for h in asyncio_log.handlers if h.get_name() == "orchestrator-loop-blocking"]:
+            asyncio_log.removeHandler(handler)
+        self.blocking_log = _BlockingCallLog(self.thread.ident)
+        asyncio_log.addHandler(self.blocking_log)
+        atexit.register(self.close)
+    
+    def close(self):
+        """Close the loop's pooled HTTP client, then stop the loop and its executor."""
+        if self.loop.is_closed():
+            return
+        from _http_client import close_client
+        try:
+            asyncio.run_coroutine_threadsafe(close_client(), self.loop).result(timeout=5)
+        except Exception:
+            pass  # shutting down regardless
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logging.getLogger("asyncio").removeHandler(self.blocking_log)
+
+@st.cache_resource
+def _shared_loop() -> _BackgroundLoop:
+    """The background loop shared by every session (started once per process)."""
+    return _BackgroundLoop()
+
+class _RequestFuture(concurrent.futures.Future):
+    """Future for a queued request; cancelling it also cancels the request once it's running."""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._loop = loop
+        self.task: Optional[asyncio.Task] = None
+    
+    def cancel(self) -> bool:
+        if super().cancel():
+            return True  # still queued; the worker will skip it
+        if not self.done():
+            self._loop.call_soon_threadsafe(self._cancel_task)
+        return False
+    
+    def _cancel_task(self):
+        # Runs on the loop, where the task is always set once the request has started
+        if self.task is not None:
+            self.task.cancel()
+
+async def _drain(requests: asyncio.Queue):
+    """Run a session's queued coroutines one at a time, resolving each caller's future."""
+    while True:
+        coro, fut = await requests.get()
+        try:
+            if not fut.set_running_or_notify_cancel():
+                coro.close()
+                continue
+            # Each request is its own task, so a timed-out one can be cancelled without the worker
+            fut.task = task = asyncio.get_running_loop().create_task(coro)
+            try:
+                await asyncio.wait((task,))
+            except asyncio.CancelledError:
+                task.cancel()  # the session went away; take its request with it
+                fut.set_exception(concurrent.futures.CancelledError())
+                raise
+            if task.cancelled():
+                fut.set_exception(concurrent.futures.CancelledError())
+            elif task.exception() is not None:
+                fut.set_exception(task.exception())
+            else:
+                fut.set_result(task.result())
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            # Nothing about one request may take the worker down with it
+            if not fut.done():
+                fut.set_exception(e)
+        finally:
+            requests.task_done()
+
+def _enqueue(requests: asyncio.Queue, item: tuple):
+    """Queue a request on the loop thread, failing its future if the queue filled up meanwhile."""
+    try:
+        requests.put_nowait(item)
+    except asyncio.QueueFull as e:
+        coro, fut = item
+        coro.close()
+        if fut.set_running_or_notify_cancel():
+            fut.set_exception(e)
+
+class _SessionWorker:
+    """A session's bounded request queue and the worker draining it on the shared loop."""
+    
+    def __init__(self, bg: _BackgroundLoop):
+        self.bg = bg
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=REQUEST_QUEUE_SIZE)
+        self.worker = asyncio.run_coroutine_threadsafe(_drain(self.queue), bg.loop)
+        # Stop the worker along with the session (cancelling the future cancels its task)
+        weakref.finalize(self, self.worker.cancel)
+
+def _session_worker() -> _SessionWorker:
+    """Return this session's request worker, starting it on first use."""
+    bg = _shared_loop()
+    worker = st.session_state.get("_bg_worker")
+    if worker is None or worker.bg is not bg or worker.worker.done():
+        worker = st.session_state["_bg_worker"] = _SessionWorker(bg)
+    return worker
+
+def get_or_create_loop() -> asyncio.AbstractEventLoop:
+    """Return the long-lived event loop shared by all sessions, running on a background thread."""
+    return _shared_loop().loop
+
+def submit_async(coro) -> concurrent.futures.Future:
+    """Queue a coroutine for this session's worker; returns a future for its result.
+
+    Raises ``asyncio.QueueFull`` when too many requests are already waiting.
+    """
+    worker = _session_worker()
+    if worker.queue.full():
+        coro.close()
+        raise asyncio.QueueFull
+    
+    loop = worker.bg.loop
+    # The queue's real capacity check happens on the loop; a lost race fails the future with QueueFull
+    fut = _RequestFuture(loop)
+    loop.call_soon_threadsafe(_enqueue, worker.queue, (coro, fut))
+    return fut
+
+def wait_async(fut: concurrent.futures.Future):
+    """Wait for a submitted request, then report any event loop stalls in debug mode."""
+    try:
+        result = fut.result(timeout=REQUEST_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        # Stops the request on the loop too, so it can't hold up the session's later requests
+        fut.cancel()
+        raise
+    
+    if st.session_state.debug_mode:
+        blocking_log = _shared_loop().blocking_log
+        while blocking_log.records:
+            st.write(f"🔍 Debug: Event loop blocked: {blocking_log.records.popleft()}")
+    return result
+
+def run_async(coro):
+    """Run a coroutine on this session's worker and wait for its result."""
+    return wait_async(submit_async(coro))
+
+def _iter_updates(updates: "queue.Queue"):
+    """Yield streamed chunks until the producing request finishes (marked by None)."""
+    while (chunk := updates.get(timeout=REQUEST_TIMEOUT)) is not None:
+        yield chunk
+
 def display_header():
     """Display the main header and description."""
-    st.markdown('<h1 class="main-header">🤖 IT Help Assistant</h1>', unsafe_allow_html=True)
-    
-    st.markdown("""
-    <div class="agent-info">
-        <h3 style="color: #2c3e50; margin-bottom: 1rem;">🎯 How it works:</h3>
-        <ul style="color: #2c3e50;">
-            <li><strong>📁 File Search First:</strong> Searches internal knowledge repository</li>
-            <li><strong>🌐 Web Search Fallback:</strong> If not found internally, searches the web</li>
-            <li><strong>🎫 Ticket Creation:</strong> Creates ServiceNow tickets when explicitly requested</li>
-        </ul>
-        <p style="color: #2c3e50; font-style: italic; margin-top: 1rem;"><em>Ask me anything about IT support, company procedures, or general questions!</em></p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_HEADER_HTML, unsafe_allow_html=True)
+
+@st.cache_resource
+def env_status() -> dict:
+    """Which credentials are configured (the environment doesn't change while the app runs)."""
+    return {
+        "openai": bool(os.getenv("OPENAI_API_KEY")),
+        "sn": all(os.getenv(name) for name in ("SN_INSTANCE", "SN_USER", "SN_PASS")),
+    }
 
 def display_sidebar():
     """Display sidebar with configuration options."""
@@ -194,13 +559,14 @@ def display_sidebar():
         
         # Environment check
         st.subheader("🔧 Environment")
-        if os.getenv("OPENAI_API_KEY"):
+        status = env_status()
+        if status["openai"]:
             st.success("✅ OpenAI API Key configured")
         else:
             st.error("❌ OpenAI API Key not found")
             st.info("Please set OPENAI_API_KEY environment variable")
         
-        if all([os.getenv("SN_INSTANCE"), os.getenv("SN_USER"), os.getenv("SN_PASS")]):
+        if status["sn"]:
             st.success("✅ ServiceNow credentials configured")
         else:
             st.warning("⚠️ ServiceNow credentials not configured")
@@ -208,124 +574,112 @@ def display_sidebar():
         
         # Debug mode toggle
         st.subheader("🔧 Debug Options")
-        debug_mode = st.checkbox("Debug Mode", value=st.session_state.debug_mode)
-        if debug_mode != st.session_state.debug_mode:
-            st.session_state.debug_mode = debug_mode
-            st.rerun()
+        # (toggles are bound to session state by key, so a click needs no extra rerun)
+        st.checkbox("Debug Mode", key="debug_mode")
         
         # LLM parsing toggle
-        llm_parsing = st.checkbox("Use LLM Parsing", value=st.session_state.use_llm_parsing, 
-                                 help="Use AI to intelligently parse ticket details from natural language")
-        if llm_parsing != st.session_state.use_llm_parsing:
-            st.session_state.use_llm_parsing = llm_parsing
-            st.rerun()
+        st.checkbox("Use LLM Parsing", key="use_llm_parsing",
+                    help="Use AI to intelligently parse ticket details from natural language")
         
         # Streaming toggle
-        streaming = st.checkbox("Enable Streaming", value=st.session_state.use_streaming,
-                               help="Show real-time updates as agents process requests")
-        if streaming != st.session_state.use_streaming:
-            st.session_state.use_streaming = streaming
-            st.rerun()
+        st.checkbox("Enable Streaming", key="use_streaming",
+                    help="Show real-time updates as agents process requests")
         
         # Clear chat button
         st.subheader("🗑️ Chat Management")
         if st.button("Clear Chat History"):
+            banner_shown = st.session_state.conversation_context["waiting_for_ticket_details"]
             st.session_state.messages = []
-            st.session_state.conversation_context = {
-                "current_agent": None,
-                "waiting_for_ticket_details": False,
-                "ticket_details": {},
-                "conversation_history": []
-            }
-            st.rerun()
+            st.session_state.conversation_context = _empty_ctx()
+            # The chat below hasn't been drawn yet this run; only a ticket-mode banner above would be stale
+            if banner_shown:
+                st.rerun()
 
+@functools.lru_cache(maxsize=256)
 def format_message_for_ui(message: str) -> str:
     """Format the orchestrator response for better UI display."""
-    # Remove console-style prefixes
-    message = message.replace("🤖 LLM Orchestrator: Analyzing request...", "")
-    message = message.replace("🤖 LLM Orchestrator: Starting with FILE_SEARCH agent...", "")
-    message = message.replace("🤖 LLM Orchestrator: File Search returned no results, falling back to WEB_SEARCH...", "")
-    message = message.replace("🤖 LLM Orchestrator: Routing to TICKET agent...", "")
-    
-    # Clean up the message
-    message = message.strip()
-    
-    return message
+    # Remove console-style prefixes in one pass and clean up the message
+    return _CONSOLE_PREFIX_RE.sub("", message).strip()
 
 def display_chat_message(role: str, content: str):
     """Display a chat message with proper styling."""
     if role == "user":
-        st.markdown(f"""
-        <div class="chat-message user-message">
-            <strong>👤 You:</strong><br>
-            {content}
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_USER_HTML.format(content=content), unsafe_allow_html=True)
+        return
+    
+    # Parse the content to identify different result types, then emit the whole bubble at once
+    html_parts = [_ASSISTANT_OPEN_HTML]
+    if (match := _RESPONSE_RE.search(content)):
+        html_parts.append(_FILE_RESULT_HTML.format(content=match.group("file").strip()))
+        web_part = (match.group("web") or "").strip()
+        if web_part:
+            html_parts.append(_WEB_RESULT_HTML.format(content=web_part))
+    elif (match := _TICKET_RESPONSE_RE.search(content)):
+        html_parts.append(_TICKET_RESULT_HTML.format(content=match.group("ticket").strip()))
     else:
-        # Parse the content to identify different result types
-        if "📁 File Search Agent Response:" in content:
-            parts = content.split("📁 File Search Agent Response:")
-            if len(parts) > 1:
-                file_part = parts[1].split("🌐 Web Search Agent Response:")[0].strip()
-                web_part = parts[1].split("🌐 Web Search Agent Response:")[1].strip() if "🌐 Web Search Agent Response:" in parts[1] else None
-                
-                st.markdown(f"""
-                <div class="chat-message assistant-message">
-                    <strong>🤖 Assistant:</strong><br>
-                    <div class="file-search-result">
-                        <strong>📁 Internal Knowledge:</strong><br>
-                        {file_part}
-                    </div>
-                """, unsafe_allow_html=True)
-                
-                if web_part:
-                    st.markdown(f"""
-                    <div class="web-search-result">
-                        <strong>🌐 Web Search:</strong><br>
-                        {web_part}
-                    </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown("</div>", unsafe_allow_html=True)
-        elif "🎫 Ticket Agent Response:" in content:
-            ticket_content = content.split("🎫 Ticket Agent Response:")[1].strip()
-            st.markdown(f"""
-            <div class="chat-message assistant-message">
-                <strong>🤖 Assistant:</strong><br>
-                <div class="ticket-result">
-                    <strong>🎫 Ticket Creation:</strong><br>
-                    {ticket_content}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="chat-message assistant-message">
-                <strong>🤖 Assistant:</strong><br>
-                {content}
-            </div>
-            """, unsafe_allow_html=True)
+        html_parts.append(content)
+    html_parts.append("</div>")
+    
+    st.markdown("".join(html_parts), unsafe_allow_html=True)
 
 def display_chat_history():
     """Display the chat history."""
+    summary = st.session_state.conversation_context.get("summary")
+    if summary:
+        with st.expander("📝 Earlier conversation (summarized)"):
+            st.markdown(summary)
+    
     for message in st.session_state.messages:
         display_chat_message(message["role"], message["content"])
 
-async def handle_conversation_context_streaming(user_input: str, stream_callback=None) -> tuple[str, bool]:
+class _SessionData:
+    """What a request needs from its session, captured on the script thread.
+
+    Requests run on the shared loop thread, which must not touch ``st.*``; they work on these
+    objects instead (the context, history and parse cache are the session's own, updated in place)
+    and leave debug messages here for the script thread to show.
+    """
+    
+    def __init__(self):
+        state = st.session_state
+        self.context = state.conversation_context
+        self.messages = state.messages
+        self.vector_store_ids = list(state.vector_store_ids)
+        self.session_id = state.session_id
+        self.use_llm_parsing = state.use_llm_parsing
+        self.debug_mode = state.debug_mode
+        self.parse_cache = _ticket_parse_cache()
+        self.debug_messages: List[str] = []
+    
+    def debug(self, message: str):
+        """Note a debug message (shown only in debug mode)."""
+        if self.debug_mode:
+            self.debug_messages.append(message)
+    
+    def show_debug(self):
+        """Write the noted debug messages; call on the script thread."""
+        for message in self.debug_messages:
+            st.write(f"🔍 Debug: {message}")
+        self.debug_messages.clear()
+
+async def handle_conversation_context_streaming(user_input: str, session: _SessionData, stream_callback=None) -> tuple[str, bool]:
     """Handle conversation context with streaming support."""
-    context = st.session_state.conversation_context
+    context = session.context
     
     # If we're waiting for ticket details, treat this as ticket details
     if context["waiting_for_ticket_details"]:
         if stream_callback:
             stream_callback("🎫 Processing ticket details...")
         
-        # Use LLM to intelligently parse the user input for ticket details
-        details = await parse_ticket_details_llm_streaming(user_input, context["ticket_details"], stream_callback)
-        
-        # Always update with new details
-        context["ticket_details"].update(details)
+        # The same message on top of the same details was already parsed; nothing new to add
+        parse_hash = hash(_ticket_parse_key(user_input, context["ticket_details"]))
+        if parse_hash != context.get("_last_parse_hash"):
+            # Use LLM to intelligently parse the user input for ticket details
+            details = await parse_ticket_details_llm_streaming(user_input, session, context["ticket_details"], stream_callback)
+            
+            # Always update with new details
+            context["ticket_details"].update(details)
+            context["_last_parse_hash"] = hash(_ticket_parse_key(user_input, context["ticket_details"]))
         
         # Check if we have enough information to create a ticket
         required_fields = ["short_description", "description", "impact", "urgency"]
@@ -348,7 +702,7 @@ async def handle_conversation_context_streaming(user_input: str, stream_callback
                      f"**Urgency:** {ticket_info.get('urgency', 'N/A')}\n\n"
             
             # Create the ticket
-            result = create_ticket_with_details(context["ticket_details"])
+            result = await create_ticket_with_details(context["ticket_details"], session.session_id)
             return summary + result, True
         else:
             # Still need more details, but be more helpful
@@ -363,17 +717,21 @@ async def handle_conversation_context_streaming(user_input: str, stream_callback
     
     return user_input, False
 
-async def handle_conversation_context(user_input: str) -> tuple[str, bool]:
+async def handle_conversation_context(user_input: str, session: _SessionData) -> tuple[str, bool]:
     """Handle conversation context and determine if we should continue with current agent."""
-    context = st.session_state.conversation_context
+    context = session.context
     
     # If we're waiting for ticket details, treat this as ticket details
     if context["waiting_for_ticket_details"]:
-        # Use LLM to intelligently parse the user input for ticket details
-        details = await parse_ticket_details_llm(user_input, context["ticket_details"])
-        
-        # Always update with new details
-        context["ticket_details"].update(details)
+        # The same message on top of the same details was already parsed; nothing new to add
+        parse_hash = hash(_ticket_parse_key(user_input, context["ticket_details"]))
+        if parse_hash != context.get("_last_parse_hash"):
+            # Use LLM to intelligently parse the user input for ticket details
+            details = await parse_ticket_details_llm(user_input, session, context["ticket_details"])
+            
+            # Always update with new details
+            context["ticket_details"].update(details)
+            context["_last_parse_hash"] = hash(_ticket_parse_key(user_input, context["ticket_details"]))
         
         # Check if we have enough information to create a ticket
         required_fields = ["short_description", "description", "impact", "urgency"]
@@ -393,7 +751,7 @@ async def handle_conversation_context(user_input: str) -> tuple[str, bool]:
                      f"**Urgency:** {ticket_info.get('urgency', 'N/A')}\n\n"
             
             # Create the ticket
-            result = create_ticket_with_details(context["ticket_details"])
+            result = await create_ticket_with_details(context["ticket_details"], session.session_id)
             return summary + result, True
         else:
             # Still need more details, but be more helpful
@@ -408,109 +766,125 @@ async def handle_conversation_context(user_input: str) -> tuple[str, bool]:
     
     return user_input, False
 
-async def parse_ticket_details_llm_streaming(user_input: str, existing_details: dict = None, stream_callback=None) -> dict:
+# LLM ticket-detail parses per session, keyed on (input, details so far), so a resent
+# message doesn't cost another LLM round-trip
+_TICKET_PARSE_TTL = 600.0
+_TICKET_PARSE_CACHE_SIZE = 64
+
+def _ticket_parse_key(user_input: str, existing_details: Optional[dict]) -> Tuple[str, str]:
+    """Cache key for an LLM parse of ``user_input`` on top of ``existing_details``."""
+    details = existing_details or {}
+    if orjson is not None:
+        return user_input, orjson.dumps(details, option=orjson.OPT_SORT_KEYS, default=str).decode()
+    return user_input, json.dumps(details, sort_keys=True, default=str)
+
+def _ticket_parse_cache() -> "OrderedDict[Tuple[str, str], Tuple[float, dict]]":
+    """This session's parse cache, created on first use."""
+    if "_ticket_parse_cache" not in st.session_state:
+        st.session_state["_ticket_parse_cache"] = OrderedDict()
+    return st.session_state["_ticket_parse_cache"]
+
+def _ticket_parse_get(cache: "OrderedDict", key: Tuple[str, str]) -> Optional[dict]:
+    """Return the parse cached for this key within the TTL, if any."""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= _TICKET_PARSE_TTL:
+        del cache[key]
+        return None
+    return dict(entry[1])
+
+def _ticket_parse_put(cache: "OrderedDict", key: Tuple[str, str], details: dict) -> None:
+    """Remember a parse, evicting the oldest entry when full."""
+    cache[key] = (time.monotonic(), dict(details))
+    cache.move_to_end(key)
+    if len(cache) > _TICKET_PARSE_CACHE_SIZE:
+        cache.popitem(last=False)
+
+async def parse_ticket_details_llm_streaming(user_input: str, session: _SessionData, existing_details: dict = None, stream_callback=None) -> dict:
     """Use LLM to intelligently parse ticket details from natural language input with streaming."""
     # Check if LLM parsing is enabled
-    if not st.session_state.use_llm_parsing:
-        return parse_ticket_details_simple(user_input)
+    if not session.use_llm_parsing:
+        return parse_ticket_details_simple(user_input, session.debug)
+    
+    key = _ticket_parse_key(user_input, existing_details)
+    cached = _ticket_parse_get(session.parse_cache, key)
+    if cached is not None:
+        return cached
     
     try:
-        from ticket_details_agent import interpret_ticket_details_streaming
-        return await interpret_ticket_details_streaming(user_input, existing_details, stream_callback)
+        details = await _ticket_details().interpret_ticket_details_streaming(user_input, existing_details, stream_callback)
+        _ticket_parse_put(session.parse_cache, key, details)
+        return details
     except Exception as e:
-        if st.session_state.debug_mode:
-            st.write(f"🔍 Debug: LLM parsing failed: {e}")
+        session.debug(f"LLM parsing failed: {e}")
         # Fallback to simple parsing
-        return parse_ticket_details_simple(user_input)
+        return parse_ticket_details_simple(user_input, session.debug)
 
-async def parse_ticket_details_llm(user_input: str, existing_details: dict = None) -> dict:
+async def parse_ticket_details_llm(user_input: str, session: _SessionData, existing_details: dict = None) -> dict:
     """Use LLM to intelligently parse ticket details from natural language input."""
     # Check if LLM parsing is enabled
-    if not st.session_state.use_llm_parsing:
-        return parse_ticket_details_simple(user_input)
+    if not session.use_llm_parsing:
+        return parse_ticket_details_simple(user_input, session.debug)
+    
+    key = _ticket_parse_key(user_input, existing_details)
+    cached = _ticket_parse_get(session.parse_cache, key)
+    if cached is not None:
+        return cached
     
     try:
-        from ticket_details_agent import interpret_ticket_details
-        return await interpret_ticket_details(user_input, existing_details)
+        details = await _ticket_details().interpret_ticket_details(user_input, existing_details)
+        _ticket_parse_put(session.parse_cache, key, details)
+        return details
     except Exception as e:
-        if st.session_state.debug_mode:
-            st.write(f"🔍 Debug: LLM parsing failed: {e}")
+        session.debug(f"LLM parsing failed: {e}")
         # Fallback to simple parsing
-        return parse_ticket_details_simple(user_input)
+        return parse_ticket_details_simple(user_input, session.debug)
 
-def parse_ticket_details_simple(user_input: str) -> dict:
+def parse_ticket_details_simple(user_input: str, debug=None) -> dict:
     """Simple fallback parsing when LLM is not available."""
     details = {}
-    input_lower = user_input.lower()
     
     # Debug output
-    if st.session_state.debug_mode:
-        st.write(f"🔍 Debug: Simple parsing input: '{user_input}'")
+    if debug:
+        debug(f"Simple parsing input: '{user_input}'")
+    
+    # One scan collects every impact/urgency/device keyword in the input
+    flags = _ticket_keyword_flags(user_input)
     
     # Extract short description (usually the first meaningful phrase)
-    if not details.get("short_description"):
-        # Look for laptop/computer related issues
-        if any(word in input_lower for word in ["laptop", "computer", "pc", "monitor", "screen"]):
-            # Extract the issue description
-            words = user_input.split()
-            for i, word in enumerate(words):
-                if any(issue in word.lower() for issue in ["broken", "not working", "won't", "doesn't", "failed"]):
-                    # Get a few words around the issue
-                    start = max(0, i-2)
-                    end = min(len(words), i+3)
-                    details["short_description"] = " ".join(words[start:end])
-                    break
-            if not details.get("short_description"):
-                details["short_description"] = user_input[:50] + "..." if len(user_input) > 50 else user_input
-        else:
-            # For non-laptop issues, use the first part of the input
-            details["short_description"] = user_input[:50] + "..." if len(user_input) > 50 else user_input
+    issue = _ISSUE_WORD_RE.search(user_input) if "device" in flags else None
+    if issue:
+        # Laptop/computer issue: get a few words around the word holding the issue
+        words = user_input.split()
+        before = user_input[:issue.start()]
+        i = len(before.split()) - (1 if before and not before[-1].isspace() else 0)
+        details["short_description"] = " ".join(words[max(0, i-2):i+3])
+    else:
+        details["short_description"] = user_input[:50] + "..." if len(user_input) > 50 else user_input
     
     # Extract description (the full problem description)
-    if not details.get("description"):
-        details["description"] = user_input
-    
-    # Extract impact level
-    if not details.get("impact"):
-        if any(word in input_lower for word in ["high impact", "high", "critical", "urgent", "emergency"]):
-            details["impact"] = "1"
-        elif any(word in input_lower for word in ["medium impact", "medium", "moderate"]):
-            details["impact"] = "2"
-        elif any(word in input_lower for word in ["low impact", "low", "minor"]):
-            details["impact"] = "3"
-        else:
-            # Default to medium if not specified
-            details["impact"] = "2"
-    
-    # Extract urgency level
-    if not details.get("urgency"):
-        if any(word in input_lower for word in ["urgent", "urgently", "asap", "immediate", "high urgency"]):
-            details["urgency"] = "1"
-        elif any(word in input_lower for word in ["medium urgency", "moderate"]):
-            details["urgency"] = "2"
-        elif any(word in input_lower for word in ["low urgency", "when convenient"]):
-            details["urgency"] = "3"
-        else:
-            # Default to medium if not specified
-            details["urgency"] = "2"
+    details["description"] = user_input
+    
+    # Extract impact and urgency levels, defaulting to medium if not specified
+    for field in ("impact", "urgency"):
+        details[field] = next((level for level in "123" if f"{field}_{level}" in flags), "2")
     
     # Debug output
-    if st.session_state.debug_mode:
-        st.write(f"🔍 Debug: Simple parsed details: {details}")
+    if debug:
+        debug(f"Simple parsed details: {details}")
     
     return details
 
-def create_ticket_with_details(details: dict) -> str:
-    """Create a ticket with the collected details."""
+async def create_ticket_with_details(details: dict, session_id: Optional[str] = None) -> str:
+    """Create a ticket with the collected details (a repeat within the same session returns the earlier ticket)."""
     try:
-        # Import the ticket creation function
-        from ticket_agent import create_servicenow_incident
-        
-        result = create_servicenow_incident(
+        result = await _ticket().create_servicenow_incident(
             short_description=details.get("short_description", "IT Support Request"),
             description=details.get("description", "Support request from chat interface"),
             urgency=details.get("urgency", "3"),
-            impact=details.get("impact", "3")
+            impact=details.get("impact", "3"),
+            scope=session_id,
         )
         
         if "error" in result:
@@ -522,23 +896,37 @@ def create_ticket_with_details(details: dict) -> str:
     except Exception as e:
         return f"❌ Error creating ticket: {str(e)}"
 
-async def get_orchestrator_response_streaming(user_input: str, stream_callback=None) -> str:
+async def trim_chat_history(session: _SessionData):
+    """Fold the oldest messages into the conversation summary once the window is full."""
+    messages = session.messages
+    if len(messages) <= MAX_MESSAGES:
+        return
+    
+    context = session.context
+    old = messages[:SUMMARIZE_BATCH]
+    try:
+        context["summary"] = await _orchestrator().summarize_conversation(old, context.get("summary"))
+    except Exception as e:
+        session.debug(f"Summarizing history failed: {e}")
+    del messages[:SUMMARIZE_BATCH]
+
+async def get_orchestrator_response_streaming(user_input: str, session: _SessionData, stream_callback=None) -> str:
     """Get response from the orchestrator with streaming support."""
     try:
         # Check if we're in a conversation context
-        processed_input, is_context_handled = await handle_conversation_context_streaming(user_input, stream_callback)
+        processed_input, is_context_handled = await handle_conversation_context_streaming(user_input, session, stream_callback)
         
         if is_context_handled:
             return processed_input
         
         # Normal orchestrator flow with streaming
-        response = await llm_orchestrate_request_streaming(processed_input, st.session_state.vector_store_ids, ui_mode=True, stream_callback=stream_callback)
+        response = await _orchestrator().llm_orchestrate_request_streaming(processed_input, session.vector_store_ids, ui_mode=True, stream_callback=stream_callback, context=session.context.get("summary"))
         
         # Check if this is a ticket creation request
         if "🎫 Ticket Agent Response:" in response:
-            st.session_state.conversation_context["waiting_for_ticket_details"] = True
-            st.session_state.conversation_context["current_agent"] = "ticket"
-            st.session_state.conversation_context["ticket_details"] = {}
+            session.context["waiting_for_ticket_details"] = True
+            session.context["current_agent"] = "ticket"
+            session.context["ticket_details"] = {}
         
         return format_message_for_ui(response)
     except Exception as e:
@@ -547,84 +935,77 @@ async def get_orchestrator_response_streaming(user_input: str, stream_callback=N
             stream_callback(error_msg)
         return error_msg
 
-async def get_orchestrator_response(user_input: str) -> str:
+async def get_orchestrator_response(user_input: str, session: _SessionData) -> str:
     """Get response from the orchestrator with conversation context handling."""
     try:
         # Check if we're in a conversation context
-        processed_input, is_context_handled = await handle_conversation_context(user_input)
+        processed_input, is_context_handled = await handle_conversation_context(user_input, session)
         
         if is_context_handled:
             return processed_input
         
         # Normal orchestrator flow
-        response = await llm_orchestrate_request(processed_input, st.session_state.vector_store_ids, ui_mode=True)
+        response = await _orchestrator().llm_orchestrate_request(processed_input, session.vector_store_ids, ui_mode=True, context=session.context.get("summary"))
         
         # Check if this is a ticket creation request
         if "🎫 Ticket Agent Response:" in response:
-            st.session_state.conversation_context["waiting_for_ticket_details"] = True
-            st.session_state.conversation_context["current_agent"] = "ticket"
-            st.session_state.conversation_context["ticket_details"] = {}
+            session.context["waiting_for_ticket_details"] = True
+            session.context["current_agent"] = "ticket"
+            session.context["ticket_details"] = {}
         
         return format_message_for_ui(response)
     except Exception as e:
         return f"❌ Error: {str(e)}"
 
-def main():
-    """Main application function."""
-    initialize_session_state()
-    
-    # Display header
-    display_header()
-    
-    # Display sidebar
-    display_sidebar()
-    
+@_fragment
+def chat_panel():
+    """Chat history and input; reruns on its own when a message is sent."""
     # Display chat history
     display_chat_history()
     
     # Chat input with context-aware placeholder
-    placeholder_text = "Ask me anything about IT support, procedures, or create a ticket..."
-    if st.session_state.conversation_context["waiting_for_ticket_details"]:
-        placeholder_text = "Provide ticket details (short description, description, impact, urgency)..."
+    placeholder_text = (
+        _PLACEHOLDER_TICKET if st.session_state.conversation_context["waiting_for_ticket_details"] else _PLACEHOLDER_DEFAULT
+    )
     
     if prompt := st.chat_input(placeholder_text):
+        was_waiting = st.session_state.conversation_context["waiting_for_ticket_details"]
+        
         # Add user message to chat history
         st.session_state.messages.append({"role": "user", "content": prompt})
         
         # Display user message
         display_chat_message("user", prompt)
         
+        # Everything the request needs from the session, taken here on the script thread
+        session = _SessionData()
+        
         # Get assistant response (with or without streaming)
-        if st.session_state.use_streaming:
-            # Create a placeholder for streaming response
-            response_placeholder = st.empty()
-            full_response = ""
-            
-            # Streaming callback function
-            def stream_callback(chunk):
-                nonlocal full_response
-                full_response += chunk
-                response_placeholder.markdown(full_response)
-            
-            # Get assistant response with streaming
-            with st.spinner("🤖 Analyzing your request..."):
-                # Run the async function with streaming
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    response = loop.run_until_complete(get_orchestrator_response_streaming(prompt, stream_callback))
-                finally:
-                    loop.close()
-        else:
-            # Get assistant response without streaming
-            with st.spinner("🤖 Analyzing your request..."):
-                # Run the async function
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    response = loop.run_until_complete(get_orchestrator_response(prompt))
-                finally:
-                    loop.close()
+        try:
+            if st.session_state.use_streaming:
+                # Updates are handed from the loop thread to this one and painted as they arrive
+                updates = queue.Queue()
+                fut = submit_async(get_orchestrator_response_streaming(prompt, session, updates.put))
+                fut.add_done_callback(lambda _: updates.put(None))
+                
+                # Get assistant response with streaming
+                with st.spinner("🤖 Analyzing your request..."):
+                    st.write_stream(_iter_updates(updates))
+                response = wait_async(fut)
+            else:
+                # Get assistant response without streaming
+                with st.spinner("🤖 Analyzing your request..."):
+                    # Run the async function
+                    response = run_async(get_orchestrator_response(prompt, session))
+        except asyncio.QueueFull:
+            response = "⏳ I'm still busy with your earlier requests. Please try again in a moment."
+        except queue.Empty:
+            # The stream stalled before the request finished; stop it like wait_async does
+            fut.cancel()
+            response = "❌ Error: The request timed out. Please try again."
+        except concurrent.futures.TimeoutError:
+            response = "❌ Error: The request timed out. Please try again."
+        session.show_debug()
         
         # Add assistant message to chat history
         st.session_state.messages.append({"role": "assistant", "content": response})
@@ -632,8 +1013,36 @@ def main():
         # Display final assistant message
         display_chat_message("assistant", response)
         
-        # Rerun to update the display
-        st.rerun()
+        # Keep the rendered history and the orchestrator's context bounded
+        if len(st.session_state.messages) > MAX_MESSAGES:
+            with st.spinner("📝 Summarizing earlier messages..."):
+                try:
+                    run_async(trim_chat_history(session))
+                except (asyncio.QueueFull, concurrent.futures.TimeoutError):
+                    pass  # Try again after the next turn
+            session.show_debug()
+        
+        # Rerun to update the display; the whole app only when the sidebar's ticket-mode banner changes
+        if _HAS_FRAGMENTS and st.session_state.conversation_context["waiting_for_ticket_details"] == was_waiting:
+            st.rerun(scope="fragment")
+        else:
+            st.rerun()
+
+def main():
+    """Main application function."""
+    initialize_session_state()
+    
+    # Stylesheet first so everything below renders styled
+    inject_css()
+    
+    # Display header
+    display_header()
+    
+    # Display sidebar
+    display_sidebar()
+    
+    # Chat history and input
+    chat_panel()
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 """
-Test script for Streamlit UI components
+Test script for Streamlit UI components (pip install -r requirements_dev.txt, then: pytest -s test_streamlit_ui.py)
 """
 
-import asyncio
 import sys
 import os
 
+import pytest
+
 # Add the current directory to path
 sys.path.insert(0, '.')
 
@@ -35,23 +36,21 @@ if all([os.getenv("SN_INSTANCE"), os.getenv("SN_USER"), os.getenv("SN_PASS")]):
 else:
     print("⚠️ ServiceNow credentials are not fully set")
 
+# Async tests share one session-wide event loop (pytest-asyncio), so loop setup
+# and any pooled clients are reused from test to test
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+# Every orchestrated answer is labelled with the agent that produced it
+AGENT_PREFIXES = ("🎫 Ticket Agent Response:", "📁 File Search Agent Response:", "🌐 Web Search Agent Response:")
+
 # Test async function
+@pytest.mark.skipif(not os.getenv("OPENAI_API_KEY"), reason="OPENAI_API_KEY is not set")
 async def test_orchestrator():
     """Test the orchestrator function."""
-    try:
-        print("\n🧪 Testing orchestrator...")
-        result = await llm_orchestrate_request("test message", ui_mode=True)
-        print(f"✅ Orchestrator test successful: {result[:100]}...")
-    except Exception as e:
-        print(f"❌ Orchestrator test failed: {e}")
-
-if __name__ == "__main__":
-    print("🚀 Streamlit UI Test Suite")
-    print("=" * 50)
-    
-    # Run async test
-    asyncio.run(test_orchestrator())
+    print("\n🧪 Testing orchestrator...")
+    result = await llm_orchestrate_request("test message", ui_mode=True)
+    print(f"✅ Orchestrator test successful: {result[:100]}...")
     
-    print("\n✅ All tests completed!")
-    print("\nTo run the Streamlit UI:")
-    print("streamlit run streamlit_ui.py")
+    assert isinstance(result, str)
+    assert result.startswith(AGENT_PREFIXES), result
+    assert result.split("\n", 1)[1].strip(), "the agent returned an empty answer"
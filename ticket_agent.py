@@ -5,32 +5,20 @@ Specialized agent that only creates ServiceNow tickets using the agents SDK.
 """
 
 import os
-import sys
-import json
-import time
-import hashlib
+import re
 import asyncio
-import requests
+import functools
 from typing import Optional, Literal, Any, Dict
 
-# --- Optional .env loader (safe if python-dotenv isn't installed) ---
-try:
-    if os.path.exists(".env"):
-        from dotenv import load_dotenv  # type: ignore
-        load_dotenv()
-except Exception:
-    pass
-
-from pydantic import BaseModel, Field
-
-# Import the Agents SDK
-try:
-    from agents import Agent, FunctionTool, Runner  # type: ignore
-except Exception as e:
-    raise RuntimeError(
-        "Could not import your 'agents' SDK. Ensure the 'agents' package "
-        "is installed and provides Agent, FunctionTool, Runner."
-    ) from e
+# --- Optional .env loader (shared, runs once per process, skipped if already configured) ---
+from _env import OPENAI_VARS, SERVICENOW_VARS, ensure_env
+ensure_env(OPENAI_VARS + SERVICENOW_VARS)
+
+from pydantic import BaseModel, Field, ValidationError
+
+from _bootstrap import Agent, FunctionTool, Runner, json_bytes, json_pretty, parse_args
+from _http_client import close_client, get_client
+from _servicenow import MAX_ATTEMPTS, RETRY_STATUSES, idem_cache_get, idem_cache_put, idempotency_tag, retry_delay
 
 # -----------------------------
 #            POLICY
@@ -57,28 +45,21 @@ When using tools, pass strictly valid JSON that matches the tool schema.
 #       ServiceNow tool
 # -----------------------------
 
+# Secret patterns, combined so a description is scanned once
+_REDACT_RE = re.compile(
+    r"(?:password|pass|secret|api[_\- ]?key|token)\s*[:=]\s*[^\s,;]+"
+    r"|bearer\s+[a-z0-9\.\-_]+"
+    r"|ssh-rsa\s+[a-z0-9\+\/=]+",
+    re.IGNORECASE,
+)
+_NON_SPACE_RE = re.compile(r"\S")
+
+
 def _redact_secrets(text: str) -> str:
     """Basic redaction for obvious secrets."""
     if not text:
         return text
-    import re
-    patterns = [
-        r"(?i)(password|pass|secret|api[_\- ]?key|token)\s*[:=]\s*[^\s,;]+",
-        r"(?i)(bearer\s+[a-z0-9\.\-_]+)",
-        r"(?i)(ssh-rsa\s+[a-z0-9\+\/=]+)",
-    ]
-    redacted = text
-    for pat in patterns:
-        redacted = re.sub(pat, lambda m: re.sub(r"\S", "•", m.group(0)), redacted)
-    return redacted
-
-
-def _idempotency_tag(caller: Optional[str], short_description: str) -> str:
-    """Create a lightweight idempotency tag to help de-duplicate downstream."""
-    h = hashlib.sha256()
-    base = (caller or "unknown") + "|" + short_description.strip()
-    h.update(base.encode("utf-8"))
-    return h.hexdigest()[:12]
+    return _REDACT_RE.sub(lambda m: _NON_SPACE_RE.sub("•", m.group(0)), text)
 
 
 class CreateIncidentArgs(BaseModel):
@@ -91,7 +72,24 @@ class CreateIncidentArgs(BaseModel):
     category: Optional[str] = None          # e.g., "Hardware", "Software"
 
 
-def create_servicenow_incident(
+async def _prewarm_sn_client() -> None:
+    """Open a pooled connection to ServiceNow ahead of the first ticket (best effort)."""
+    sn_instance = os.environ.get("SN_INSTANCE")
+    sn_user = os.environ.get("SN_USER")
+    sn_pass = os.environ.get("SN_PASS")
+    if not all([sn_instance, sn_user, sn_pass]):
+        return
+    try:
+        await get_client().head(
+            f"https://{sn_instance}.service-now.com/api/now/table/incident",
+            params={"sysparm_limit": "1"},
+            auth=(sn_user, sn_pass),
+        )
+    except Exception:
+        pass  # the real request will report any problem
+
+
+async def create_servicenow_incident(
     short_description: str,
     description: str,
     urgency: str = "3",
@@ -99,8 +97,12 @@ def create_servicenow_incident(
     caller: Optional[str] = None,
     assignment_group: Optional[str] = None,
     category: Optional[str] = None,
+    scope: Optional[str] = None,
 ) -> Dict[str, Any]:
-    """POST to ServiceNow /api/now/table/incident with simple retries."""
+    """POST to ServiceNow /api/now/table/incident with simple retries.
+
+    A repeat of the same payload within the same ``scope`` (e.g. a chat session) returns the earlier incident.
+    """
     sn_instance = os.environ.get("SN_INSTANCE")
     sn_user = os.environ.get("SN_USER")
     sn_pass = os.environ.get("SN_PASS")
@@ -113,47 +115,55 @@ def create_servicenow_incident(
     safe_desc = _redact_secrets(description)
     safe_short = _redact_secrets(short_description)
 
-    idem = _idempotency_tag(caller, safe_short)
     payload = {
         "short_description": safe_short,
-        "description": f"{safe_desc}\n\n[idempotency:{idem}]",
+        "description": safe_desc,
         "urgency": urgency,
         "impact": impact,
+        # Optional fields are sent only when given
+        **{k: v for k, v in (("caller_id", caller), ("assignment_group", assignment_group), ("category", category)) if v},
     }
-    if caller:
-        payload["caller_id"] = caller
-    if assignment_group:
-        payload["assignment_group"] = assignment_group
-    if category:
-        payload["category"] = category
+
+    idem = idempotency_tag(payload, scope)
+    cached = idem_cache_get(idem)
+    if cached is not None:
+        return cached
+    payload["description"] = f"{safe_desc}\n\n[idempotency:{idem}]"
+
+    import httpx
+
+    body = json_bytes(payload)
+    client = get_client()
 
     attempts = 0
     last_error = None
-    while attempts < 3:
+    while attempts < MAX_ATTEMPTS:
         attempts += 1
+        retry_after = None
         try:
-            r = requests.post(
-                url,
-                json=payload,
-                auth=(sn_user, sn_pass),
-                headers={"Accept": "application/json"},
-                timeout=15,
-            )
-            # retry on transient issues
-            if r.status_code in (429, 500, 502, 503, 504):
-                time.sleep(1.5 * attempts)
-                continue
-            r.raise_for_status()
-            data = r.json().get("result", {})
-            return {
-                "number": data.get("number"),
-                "sys_id": data.get("sys_id"),
-                "url": f"https://{sn_instance}.service-now.com/nav_to.do?uri=incident.do?sys_id={data.get('sys_id')}",
-                "idempotency": idem,
-            }
-        except Exception as ex:
+            r = await client.post(url, content=body, auth=(sn_user, sn_pass))
+            # retry on transient issues; any other error status won't improve on retry
+            if r.status_code in RETRY_STATUSES:
+                retry_after = r.headers.get("Retry-After")
+                last_error = f"HTTP {r.status_code}"
+            else:
+                r.raise_for_status()
+                data = r.json().get("result", {})
+                result = {
+                    "number": data.get("number"),
+                    "sys_id": data.get("sys_id"),
+                    "url": f"https://{sn_instance}.service-now.com/nav_to.do?uri=incident.do?sys_id={data.get('sys_id')}",
+                    "idempotency": idem,
+                }
+                idem_cache_put(idem, result)
+                return result
+        except httpx.TransportError as ex:
+            # connection failures and timeouts are worth another try
             last_error = f"{type(ex).__name__}: {ex}"
-            time.sleep(1.0 * attempts)
+        except Exception as ex:
+            return {"error": f"ServiceNow API request failed. Detail: {type(ex).__name__}: {ex}"}
+        if attempts < MAX_ATTEMPTS:
+            await asyncio.sleep(retry_delay(attempts, retry_after))
 
     return {"error": f"ServiceNow API failed after retries. Detail: {last_error}"}
 
@@ -161,25 +171,31 @@ def create_servicenow_incident(
 #        Agent + Runner
 # -----------------------------
 
+# Tool schema, generated once rather than per agent build
+_CREATE_INCIDENT_SCHEMA = CreateIncidentArgs.model_json_schema()
+
+@functools.lru_cache(maxsize=1)
 def build_ticket_agent():
-    """Build the ticket creation agent with only ticket creation capabilities."""
+    """Build the ticket creation agent with only ticket creation capabilities (built once and reused)."""
     # Create FunctionTool using the correct constructor pattern
     async def on_invoke_tool(tool_context, args):
         """Wrapper to handle the function call with proper argument parsing."""
-        import json
-        if isinstance(args, str):
-            args = json.loads(args)
-        return create_servicenow_incident(**args)
+        try:
+            model = parse_args(CreateIncidentArgs, args)
+        except ValidationError as e:
+            return {"error": f"Invalid ticket details: {e}"}
+        return await create_servicenow_incident(**model.model_dump(exclude_none=True))
     
     create_ticket_tool = FunctionTool(
         name="create_servicenow_incident",
         description="Create a ServiceNow incident ticket.",
-        params_json_schema=CreateIncidentArgs.model_json_schema(),
+        params_json_schema=_CREATE_INCIDENT_SCHEMA,
         on_invoke_tool=on_invoke_tool
     )
 
     agent = Agent(
         name="TicketAgent",
+        instructions=TICKET_CREATION_INSTRUCTIONS,
         tools=[create_ticket_tool],
     )
     return agent
@@ -187,39 +203,42 @@ def build_ticket_agent():
 async def run_ticket_creation(question: str) -> str:
     """Run ticket creation for the given request."""
     agent = build_ticket_agent()
-    full_prompt = f"{TICKET_CREATION_INSTRUCTIONS}\n\nQuestion: {question}"
-    result = await Runner.run(agent, full_prompt)
+    result = await Runner.run(agent, question)
 
     # Be flexible about result shape
     out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
-    return out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2)
+    return out if isinstance(out, str) else json_pretty(out)
 
 async def run_ticket_creation_streaming(question: str, stream_callback=None):
     """Run ticket creation with streaming support."""
     agent = build_ticket_agent()
-    full_prompt = f"{TICKET_CREATION_INSTRUCTIONS}\n\nQuestion: {question}"
     
     if stream_callback:
         # Send initial status
         stream_callback("🎫 Processing ticket request...")
     
     try:
-        result = await Runner.run(agent, full_prompt)
-        
-        if stream_callback:
-            stream_callback("📝 Analyzing ticket details...")
+        # Forward the model's text as it is generated
+        streamed = Runner.run_streamed(agent, question)
+        sent = False
+        try:
+            async for event in streamed.stream_events():
+                if event.type == "raw_response_event" and getattr(event.data, "type", None) == "response.output_text.delta":
+                    if stream_callback:
+                        stream_callback(event.data.delta)
+                    sent = True
+        except asyncio.CancelledError:
+            # The run has its own background task; stop it along with us
+            streamed.cancel()
+            raise
         
         # Be flexible about result shape
-        out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
-        final_result = out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2)
+        out = streamed.final_output
+        final_result = out if isinstance(out, str) else json_pretty(out)
         
-        if stream_callback:
-            # Stream the final result in chunks
-            chunk_size = 50
-            for i in range(0, len(final_result), chunk_size):
-                chunk = final_result[i:i + chunk_size]
-                stream_callback(chunk)
-                await asyncio.sleep(0.05)  # Small delay for streaming effect
+        if stream_callback and not sent:
+            # Nothing came through as text deltas; send the result in one piece
+            stream_callback(final_result)
         
         return final_result
         
@@ -234,30 +253,47 @@ async def ticket_creation_repl():
     print("Ticket Creation Agent (UK) — type 'exit' to quit.")
     agent = build_ticket_agent()
     
-    while True:
-        try:
-            question = input("\nYou: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            print("\nBye!")
-            return
-        if not question:
-            continue
-        if question.lower() in {"exit", "quit"}:
-            print("Bye!")
-            return
-
-        full_prompt = f"{TICKET_CREATION_INSTRUCTIONS}\n\nQuestion: {question}"
-        result = await Runner.run(agent, full_prompt)
-        out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
-        try:
-            print("\nTicketAgent:", out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2))
-        except Exception:
-            print("\nTicketAgent:", str(out))
+    # Set up the TLS connection to ServiceNow while the user types their first request
+    warmup = asyncio.create_task(_prewarm_sn_client())
+    
+    try:
+        while True:
+            try:
+                # Read on a worker thread so the event loop keeps running while the user types
+                question = (await asyncio.to_thread(input, "\nYou: ")).strip()
+            except (EOFError, KeyboardInterrupt):
+                print("\nBye!")
+                return
+            if not question:
+                continue
+            if question.lower() in {"exit", "quit"}:
+                print("Bye!")
+                return
+
+            # Let the pooled connection finish opening rather than racing it with a second one
+            await warmup
+            result = await Runner.run(agent, question)
+            out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
+            try:
+                print("\nTicketAgent:", out if isinstance(out, str) else json_pretty(out))
+            except Exception:
+                print("\nTicketAgent:", str(out))
+    finally:
+        # Don't leave the prewarm pending when the REPL ends
+        warmup.cancel()
 
 # -----------------------------
 #              CLI
 # -----------------------------
 if __name__ == "__main__":
+    # --- Optional faster event loop (safe if uvloop isn't installed) ---
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
+    import sys
     import argparse
 
     parser = argparse.ArgumentParser(description="Ticket Creation Agent - specialized for ServiceNow ticket creation.")
@@ -270,8 +306,13 @@ if __name__ == "__main__":
         print("OPENAI_API_KEY not set. Please export it or add to .env")
         sys.exit(1)
 
-    if user_question:
-        result = asyncio.run(run_ticket_creation(user_question))
-        print(result)
-    else:
-        asyncio.run(ticket_creation_repl())
+    async def main():
+        try:
+            if user_question:
+                print(await run_ticket_creation(user_question))
+            else:
+                await ticket_creation_repl()
+        finally:
+            await close_client()
+
+    asyncio.run(main())
@@ -3,12 +3,28 @@
 Ticket Details Agent - Uses LLM to intelligently parse and fill ticket details from natural language input.
 """
 
+import re
 import json
 import asyncio
-from typing import Dict, Any, Optional
-from agents import Agent, Runner
+import functools
+from typing import Dict, Any, Optional, List
 from pydantic import BaseModel, Field
 
+from _bootstrap import Agent, Runner, json_compact, json_pretty
+
+_DECODER = json.JSONDecoder()
+
+def _extract_json(response: str) -> Optional[Dict[str, Any]]:
+    """Decode the first JSON object in a reply, ignoring any text around it; None if there isn't one."""
+    start = response.find("{")
+    if start < 0:
+        return None
+    try:
+        parsed, _end = _DECODER.raw_decode(response, start)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
 class TicketDetails(BaseModel):
     """Schema for ticket details."""
     short_description: str = Field(description="Brief one-line summary of the issue")
@@ -41,7 +57,7 @@ PARSING RULES:
 4. **Urgency Assessment**: Determine how quickly this needs resolution
    - "Can't work", "urgent", "emergency" → High Urgency (1)
    - "Need help", "when possible" → Medium Urgency (2)
-   - "When convenient", "no rush" → Low Urgency (2)
+   - "When convenient", "no rush" → Low Urgency (3)
 
 INTELLIGENT ASSUMPTIONS:
 - If user mentions "broken laptop" but no impact/urgency → Assume High Impact (1), Medium Urgency (2)
@@ -61,8 +77,51 @@ Return ONLY a valid JSON object with this exact structure:
 Do not include any explanation text - just the JSON object.
 """
 
+# Common requests the impact/urgency rules above settle on their own: (pattern, impact, urgency)
+_KEYWORD_TABLE = (
+    (re.compile(r"\b(?:laptop|monitor|printer)s?\b", re.I), "1", "2"),
+    (re.compile(r"\b(?:urgent|emergency|can'?t work)\b", re.I), "1", "1"),
+    (re.compile(r"\b(?:password reset|how do i)\b", re.I), "3", "3"),
+)
+
+# Fields the user has stated themselves (e.g. "impact: 3", "urgency 2", "short description: ...");
+# those must be parsed by the LLM, never overridden by the table above
+_EXPLICIT_FIELD_RE = re.compile(r"\b(?:impact|urgency|priority|(?:short[\s_-]*)?description|summary|title)\b", re.I)
+
+# Cues that lower the urgency the table would assign; the LLM weighs those instead
+_LOW_URGENCY_RE = re.compile(
+    r"\b(?:no rush|no hurry|not urgent|low priority|when(?:ever)? (?:convenient|possible|you can|you get a chance))\b", re.I
+)
+
+# First sentence or clause of the request, used as its one-line summary
+_FIRST_CLAUSE_RE = re.compile(r"[^.!?;,\n]+")
+
+def _short_description(user_input: str, limit: int = 80) -> str:
+    """One-line summary of a request: its first clause, cut at a word boundary if too long."""
+    match = _FIRST_CLAUSE_RE.search(user_input)
+    summary = (match.group(0) if match else user_input).strip()
+    if len(summary) > limit:
+        summary = summary[:limit].rsplit(" ", 1)[0] + "..."
+    return summary[:1].upper() + summary[1:]
+
+def _classify_locally(user_input: str, existing_details: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Ticket details for a new, unstructured request that matches exactly one common case, else None."""
+    if existing_details or _EXPLICIT_FIELD_RE.search(user_input) or _LOW_URGENCY_RE.search(user_input):
+        return None
+    hits = [(impact, urgency) for pattern, impact, urgency in _KEYWORD_TABLE if pattern.search(user_input)]
+    if len(hits) != 1:
+        return None  # nothing recognised, or ambiguous: ask the LLM
+    impact, urgency = hits[0]
+    return {
+        "short_description": _short_description(user_input),
+        "description": user_input,
+        "impact": impact,
+        "urgency": urgency
+    }
+
+@functools.lru_cache(maxsize=1)
 def build_ticket_details_agent() -> Agent:
-    """Build the ticket details interpretation agent."""
+    """Build the ticket details interpretation agent (built once and reused)."""
     return Agent(
         name="ticket_details_interpreter",
         instructions=TICKET_DETAILS_INSTRUCTIONS,
@@ -80,12 +139,17 @@ async def interpret_ticket_details(user_input: str, existing_details: Optional[D
     Returns:
         Complete ticket details dictionary
     """
+    # Clear-cut requests skip the LLM round trip
+    local = _classify_locally(user_input, existing_details)
+    if local is not None:
+        return local
+    
     agent = build_ticket_details_agent()
     
     # Build context-aware prompt
     context = ""
     if existing_details:
-        context = f"\n\nEXISTING DETAILS: {json.dumps(existing_details, indent=2)}\n\nMerge with new information from user input."
+        context = f"\n\nEXISTING DETAILS: {json_compact(existing_details)}\n\nMerge with new information from user input."
     
     prompt = f"User Input: {user_input}{context}\n\nExtract and complete ticket details:"
     
@@ -97,14 +161,8 @@ async def interpret_ticket_details(user_input: str, existing_details: Optional[D
         response = response.strip()
         
         # Try to find JSON in the response
-        if "{" in response and "}" in response:
-            start = response.find("{")
-            end = response.rfind("}") + 1
-            json_str = response[start:end]
-            
-            # Parse the JSON
-            parsed_details = json.loads(json_str)
-            
+        parsed_details = _extract_json(response)
+        if parsed_details is not None:
             # Validate and ensure all required fields
             required_fields = ["short_description", "description", "impact", "urgency"]
             for field in required_fields:
@@ -123,7 +181,7 @@ async def interpret_ticket_details(user_input: str, existing_details: Optional[D
         else:
             # Fallback if no JSON found
             return {
-                "short_description": user_input[:50] + "..." if len(user_input) > 50 else user_input,
+                "short_description": _short_description(user_input),
                 "description": user_input,
                 "impact": "2",
                 "urgency": "2"
@@ -133,7 +191,7 @@ async def interpret_ticket_details(user_input: str, existing_details: Optional[D
         print(f"Error interpreting ticket details: {e}")
         # Fallback parsing
         return {
-            "short_description": user_input[:50] + "..." if len(user_input) > 50 else user_input,
+            "short_description": _short_description(user_input),
             "description": user_input,
             "impact": "2",
             "urgency": "2"
@@ -151,12 +209,19 @@ async def interpret_ticket_details_streaming(user_input: str, existing_details:
     Returns:
         Complete ticket details dictionary
     """
+    # Clear-cut requests skip the LLM round trip
+    local = _classify_locally(user_input, existing_details)
+    if local is not None:
+        if stream_callback:
+            stream_callback("✅ Ticket details processed successfully!")
+        return local
+    
     agent = build_ticket_details_agent()
     
     # Build context-aware prompt
     context = ""
     if existing_details:
-        context = f"\n\nEXISTING DETAILS: {json.dumps(existing_details, indent=2)}\n\nMerge with new information from user input."
+        context = f"\n\nEXISTING DETAILS: {json_compact(existing_details)}\n\nMerge with new information from user input."
     
     prompt = f"User Input: {user_input}{context}\n\nExtract and complete ticket details:"
     
@@ -178,14 +243,8 @@ async def interpret_ticket_details_streaming(user_input: str, existing_details:
             stream_callback("🔍 Extracting structured data...")
         
         # Try to find JSON in the response
-        if "{" in response and "}" in response:
-            start = response.find("{")
-            end = response.rfind("}") + 1
-            json_str = response[start:end]
-            
-            # Parse the JSON
-            parsed_details = json.loads(json_str)
-            
+        parsed_details = _extract_json(response)
+        if parsed_details is not None:
             # Validate and ensure all required fields
             required_fields = ["short_description", "description", "impact", "urgency"]
             for field in required_fields:
@@ -210,7 +269,7 @@ async def interpret_ticket_details_streaming(user_input: str, existing_details:
                 stream_callback("⚠️ Using fallback parsing...")
             
             return {
-                "short_description": user_input[:50] + "..." if len(user_input) > 50 else user_input,
+                "short_description": _short_description(user_input),
                 "description": user_input,
                 "impact": "2",
                 "urgency": "2"
@@ -223,12 +282,16 @@ async def interpret_ticket_details_streaming(user_input: str, existing_details:
         print(error_msg)
         # Fallback parsing
         return {
-            "short_description": user_input[:50] + "..." if len(user_input) > 50 else user_input,
+            "short_description": _short_description(user_input),
             "description": user_input,
             "impact": "2",
             "urgency": "2"
         }
 
+async def interpret_ticket_details_batch(user_inputs: List[str]) -> List[Dict[str, Any]]:
+    """Interpret several independent requests concurrently; results come back in input order."""
+    return list(await asyncio.gather(*(interpret_ticket_details(text) for text in user_inputs)))
+
 async def test_ticket_details_agent():
     """Test the ticket details agent with various inputs."""
     test_cases = [
@@ -240,10 +303,17 @@ async def test_ticket_details_agent():
     ]
     
     print("🧪 Testing Ticket Details Agent...")
-    for test_input in test_cases:
+    results = await interpret_ticket_details_batch(test_cases)
+    for test_input, result in zip(test_cases, results):
         print(f"\nInput: {test_input}")
-        result = await interpret_ticket_details(test_input)
-        print(f"Result: {json.dumps(result, indent=2)}")
+        print(f"Result: {json_pretty(result)}")
 
 if __name__ == "__main__":
+    # --- Optional faster event loop (safe if uvloop isn't installed) ---
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
     asyncio.run(test_ticket_details_agent())
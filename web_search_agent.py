@@ -5,27 +5,15 @@ Specialized agent that only performs web searches using the agents SDK.
 """
 
 import os
-import sys
-import json
 import asyncio
+import functools
 from typing import Optional
 
-# --- Optional .env loader (safe if python-dotenv isn't installed) ---
-try:
-    if os.path.exists(".env"):
-        from dotenv import load_dotenv  # type: ignore
-        load_dotenv()
-except Exception:
-    pass
-
-# Import the Agents SDK
-try:
-    from agents import Agent, WebSearchTool, Runner  # type: ignore
-except Exception as e:
-    raise RuntimeError(
-        "Could not import your 'agents' SDK. Ensure the 'agents' package "
-        "is installed and provides Agent, WebSearchTool, Runner."
-    ) from e
+# --- Optional .env loader (shared, runs once per process, skipped if already configured) ---
+from _env import OPENAI_VARS, ensure_env
+ensure_env(OPENAI_VARS)
+
+from _bootstrap import Agent, Runner, WebSearchTool, json_pretty
 
 # -----------------------------
 #            POLICY
@@ -48,52 +36,58 @@ When using tools, pass strictly valid JSON that matches the tool schema.
 #        Agent + Runner
 # -----------------------------
 
+# The hosted web search tool is plain configuration, so one instance serves every agent
+_WS_TOOL = WebSearchTool()
+
+@functools.lru_cache(maxsize=1)
 def build_web_search_agent():
-    """Build the web search agent with only web search capabilities."""
-    ws_tool = WebSearchTool()
-    
+    """Build the web search agent with only web search capabilities (built once and reused)."""
     agent = Agent(
         name="WebSearchAgent",
-        tools=[ws_tool],
+        instructions=WEB_SEARCH_INSTRUCTIONS,
+        tools=[_WS_TOOL],
     )
     return agent
 
 async def run_web_search(question: str) -> str:
     """Run a web search for the given question."""
     agent = build_web_search_agent()
-    full_prompt = f"{WEB_SEARCH_INSTRUCTIONS}\n\nQuestion: {question}"
-    result = await Runner.run(agent, full_prompt)
+    result = await Runner.run(agent, question)
 
     # Be flexible about result shape
     out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
-    return out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2)
+    return out if isinstance(out, str) else json_pretty(out)
 
 async def run_web_search_streaming(question: str, stream_callback=None):
     """Run a web search with streaming support."""
     agent = build_web_search_agent()
-    full_prompt = f"{WEB_SEARCH_INSTRUCTIONS}\n\nQuestion: {question}"
     
     if stream_callback:
         # Send initial status
         stream_callback("🔍 Searching the web...")
     
     try:
-        result = await Runner.run(agent, full_prompt)
-        
-        if stream_callback:
-            stream_callback("📝 Processing results...")
+        # Forward the model's text as it is generated
+        streamed = Runner.run_streamed(agent, question)
+        sent = False
+        try:
+            async for event in streamed.stream_events():
+                if event.type == "raw_response_event" and getattr(event.data, "type", None) == "response.output_text.delta":
+                    if stream_callback:
+                        stream_callback(event.data.delta)
+                    sent = True
+        except asyncio.CancelledError:
+            # The run has its own background task; stop it along with us
+            streamed.cancel()
+            raise
         
         # Be flexible about result shape
-        out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
-        final_result = out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2)
+        out = streamed.final_output
+        final_result = out if isinstance(out, str) else json_pretty(out)
         
-        if stream_callback:
-            # Stream the final result in chunks
-            chunk_size = 50
-            for i in range(0, len(final_result), chunk_size):
-                chunk = final_result[i:i + chunk_size]
-                stream_callback(chunk)
-                await asyncio.sleep(0.05)  # Small delay for streaming effect
+        if stream_callback and not sent:
+            # Nothing came through as text deltas; send the result in one piece
+            stream_callback(final_result)
         
         return final_result
         
@@ -110,7 +104,8 @@ async def web_search_repl():
     
     while True:
         try:
-            question = input("\nYou: ").strip()
+            # Read on a worker thread so the event loop keeps running while the user types
+            question = (await asyncio.to_thread(input, "\nYou: ")).strip()
         except (EOFError, KeyboardInterrupt):
             print("\nBye!")
             return
@@ -120,11 +115,10 @@ async def web_search_repl():
             print("Bye!")
             return
 
-        full_prompt = f"{WEB_SEARCH_INSTRUCTIONS}\n\nQuestion: {question}"
-        result = await Runner.run(agent, full_prompt)
+        result = await Runner.run(agent, question)
         out = getattr(result, "final_output", None) or getattr(result, "output_text", None) or result
         try:
-            print("\nWebSearchAgent:", out if isinstance(out, str) else json.dumps(out, ensure_ascii=False, indent=2))
+            print("\nWebSearchAgent:", out if isinstance(out, str) else json_pretty(out))
         except Exception:
             print("\nWebSearchAgent:", str(out))
 
@@ -132,6 +126,14 @@ async def web_search_repl():
 #              CLI
 # -----------------------------
 if __name__ == "__main__":
+    # --- Optional faster event loop (safe if uvloop isn't installed) ---
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
+    import sys
     import argparse
 
     parser = argparse.ArgumentParser(description="Web Search Agent - specialized for web searches.")